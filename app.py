@@ -1,20 +1,47 @@
 from flask import Flask, render_template, request
+from config import Config
 from models import db, User
+from models.migrations import run_migrations
 from werkzeug.security import generate_password_hash
+from controllers.api_v1 import api as api_v1
 from controllers.auth import api as auth_api
-def create_app():
+from controllers.metrics import api as metrics_api
+from services.availability import ensure_availability
+from services.billing import backfill_total_costs
+from services.cache import init_cache
+from services.database import configure_sqlite, engine_options
+from services.metrics import init_metrics, publish_metrics, start_metrics_publisher
+from services.occupancy import fold_occupancy
+from services.passwords import init_passwords
+from services.reconciler import run_reconciliation, start_reconciler
+from services.reporting import ensure_daily_rollups
+from services.responses import init_responses
+from services.search import search_index_available
+
+DEV_SECRET_KEY = "shh-its-a-secret"
+
+def create_app(config=None):
     app = Flask(__name__)
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///parking.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object(Config)
     
-    app.secret_key = "shh-its-a-secret"
+    if config:
+        app.config.update(config)
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = DEV_SECRET_KEY
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     
     db.init_app(app)
 
-    from models import lot, spot, reserve, user
+    from models import lot, spot, reserve, user, rollup, availability, archive
     with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
         db.create_all()
+        run_migrations()
+        app.extensions['lot_search'] = search_index_available()
+        init_metrics(app, db.engine)
+        init_cache(app)
+        init_passwords(app)
         
         if not User.query.filter_by(id=0).first():
             db.session.add(User(
@@ -25,8 +52,23 @@ def create_app():
                 is_admin=True,
             ))
             db.session.commit()
+        
+        backfill_total_costs()
+        ensure_daily_rollups()
+        ensure_availability()
+        fold_occupancy()
     
     app.register_blueprint(auth_api)
+    app.register_blueprint(metrics_api)
+    app.register_blueprint(api_v1)
+    init_responses(app)
+    start_reconciler(app)
+    start_metrics_publisher(app)
+
+    @app.cli.command("reconcile")
+    def reconcile():
+        """Run one reconciliation pass now."""
+        print(run_reconciliation(app))
     
     @app.route("/")
     def home():
@@ -38,6 +80,19 @@ def create_app():
     
     return app
 
+def shutdown_app(app):
+    # Called as a worker exits: stop background threads, then close pooled
+    # connections so SQLite can checkpoint and release its WAL.
+    for name in ('reconciler', 'metrics_publisher'):
+        stop = app.extensions.get(name)
+        if stop is not None:
+            stop.set()
+    publish_metrics(app)
+    app.extensions['password_hasher'].shutdown()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
 if __name__ == "__main__":
     app = create_app()
     app.run(debug=True)
\ No newline at end of file
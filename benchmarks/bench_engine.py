@@ -0,0 +1,118 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import Config
+from models import db, User, Lot, Reserve
+from services.availability import refresh_lot
+from services.provisioning import add_spots
+
+CONFIGURATIONS = {
+    # Stock SQLite: rollback journal, synchronous=FULL, driver lock timeout only.
+    "default": {'SQLITE_PRAGMAS': {}},
+    "tuned": {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS},
+}
+
+
+def seed(app, writers, lots, spots):
+    password = generate_password_hash("bench")
+    with app.app_context():
+        db.session.add_all(User(name=f"w{i}", email=f"w{i}@email.com", password=password) for i in range(writers))
+        for i in range(lots):
+            lot = Lot(name=f"Lot {i}", price_per_hour=10, address="Bench Rd", pincode="000000", total_spots=spots)
+            db.session.add(lot)
+            db.session.flush()
+            add_spots(lot.id, 1, spots)
+            refresh_lot(lot.id)
+        db.session.commit()
+        return [lot.id for lot in Lot.query.all()]
+
+
+def writer(app, index, lot_ids, deadline, stats, lock):
+    client = app.test_client()
+    client.post("/login", data={'email': f"w{index}@email.com", 'password': "bench"})
+    rng = random.Random(index)
+    cycles = errors = 0
+    while time.perf_counter() < deadline:
+        response = client.post(f"/user/book/{rng.choice(lot_ids)}", data={'vehicle_number': f"B{index}"})
+        if response.status_code != 302:
+            errors += 1
+            continue
+        with app.app_context():
+            reservation = (
+                Reserve.query.join(User)
+                .filter(User.email == f"w{index}@email.com", Reserve.end_time.is_(None))
+                .first()
+            )
+        if reservation is None:
+            continue
+        response = client.post(f"/user/release/{reservation.id}")
+        if response.status_code != 302:
+            errors += 1
+            continue
+        cycles += 1
+    with lock:
+        stats['cycles'] += cycles
+        stats['errors'] += errors
+
+
+def reader(app, deadline, stats, lock):
+    client = app.test_client()
+    client.post("/login", data={'email': "w0@email.com", 'password': "bench"})
+    pages = errors = 0
+    while time.perf_counter() < deadline:
+        if client.get("/user/dashboard").status_code == 200:
+            pages += 1
+        else:
+            errors += 1
+    with lock:
+        stats['pages'] += pages
+        stats['errors'] += errors
+
+
+def run(name, overrides, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(dict(overrides, SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'engine.db')}"))
+        lot_ids = seed(app, args.writers, args.lots, args.spots)
+        with app.app_context():
+            journal = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+
+        stats = {'cycles': 0, 'pages': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=writer, args=(app, i, lot_ids, deadline, stats, lock)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(app, deadline, stats, lock)) for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        print(f"{name:>8} {journal:>8} {stats['cycles'] / args.seconds:>16.1f} "
+              f"{stats['pages'] / args.seconds:>16.1f} {stats['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking/release throughput, default vs tuned SQLite.")
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--lots', type=int, default=4)
+    parser.add_argument('--spots', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    print(f"{'config':>8} {'journal':>8} {'book+release /s':>16} {'dashboards /s':>16} {'errors':>7}")
+    for name, overrides in CONFIGURATIONS.items():
+        run(name, overrides, args)
+
+
+if __name__ == "__main__":
+    main()
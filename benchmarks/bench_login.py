@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import Config
+from models import db, User, Lot
+from services.availability import refresh_lot
+from services.provisioning import add_spots
+
+PASSWORD = "bench"
+
+
+def seed(app, users):
+    password = generate_password_hash(PASSWORD, Config.PASSWORD_HASH_METHOD)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"name": f"u{i}", "email": f"u{i}@email.com", "password": password, "is_admin": False} for i in range(users)
+        ])
+        for i in range(20):
+            lot = Lot(name=f"Lot {i}", price_per_hour=10, address="Bench Rd", pincode="000000", total_spots=50)
+            db.session.add(lot)
+            db.session.flush()
+            add_spots(lot.id, 1, 50)
+            refresh_lot(lot.id)
+        db.session.commit()
+
+
+def login_storm(app, index, users, deadline, stats, lock):
+    client = app.test_client()
+    logins = busy = 0
+    i = index
+    while time.perf_counter() < deadline:
+        response = client.post("/login", data={'email': f"u{i % users}@email.com", 'password': PASSWORD})
+        if response.status_code == 302 and response.location.endswith("/user/dashboard"):
+            logins += 1
+        else:
+            busy += 1
+        i += 7
+    with lock:
+        stats['logins'] += logins
+        stats['busy'] += busy
+
+
+def dashboard_reader(client, deadline, latencies, lock):
+    samples = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        client.get("/user/dashboard")
+        samples.append((time.perf_counter() - started) * 1000)
+    with lock:
+        latencies.extend(samples)
+
+
+def run(workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'login.db')}",
+            'PASSWORD_HASH_WORKERS': workers,
+        })
+        seed(app, args.users)
+
+        # Readers sign in before the storm starts; only their page views are measured.
+        readers = []
+        for _ in range(args.readers):
+            client = app.test_client()
+            client.post("/login", data={'email': "u0@email.com", 'password': PASSWORD})
+            readers.append(client)
+
+        stats = {'logins': 0, 'busy': 0}
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=login_storm, args=(app, i, args.users, deadline, stats, lock))
+                   for i in range(args.login_threads)]
+        threads += [threading.Thread(target=dashboard_reader, args=(client, deadline, latencies, lock))
+                    for client in readers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        app.extensions['password_hasher'].shutdown()
+
+        latencies = np.array(latencies or [0])
+        label = "inline" if workers == 0 else f"pool={workers}"
+        print(f"{label:>8} {stats['logins'] / args.seconds:>10.1f} {stats['busy']:>6} "
+              f"{len(latencies) / args.seconds:>12.1f} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput and concurrent dashboard latency.")
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--pools', default="0,1,2,4", help="hasher pool sizes to compare; 0 hashes inline")
+    args = parser.parse_args()
+
+    print(f"login threads={args.login_threads} dashboard readers={args.readers} method={Config.PASSWORD_HASH_METHOD}")
+    print(f"{'hashing':>8} {'logins/s':>10} {'busy':>6} {'dashboards/s':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in (int(w) for w in args.pools.split(",")):
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Lot, Spot
+from services.provisioning import add_spots
+
+
+def legacy_add(lot_id, total_spots):
+    for i in range(total_spots):
+        db.session.add(Spot(lot_id=lot_id, spot_number=f"Spot {i + 1}", status=False))
+
+
+def bulk_add(lot_id, total_spots):
+    add_spots(lot_id, 1, total_spots)
+
+
+def time_lot_creation(add, total_spots):
+    started = time.perf_counter()
+    lot = Lot(name='Bench', price_per_hour=10, address='Bench Rd', pincode='000000', total_spots=total_spots)
+    db.session.add(lot)
+    db.session.flush()
+    add(lot.id, total_spots)
+    db.session.commit()
+    elapsed = time.perf_counter() - started
+
+    assert Spot.query.filter_by(lot_id=lot.id).count() == total_spots
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lot creation time as total_spots grows.")
+    parser.add_argument('--sizes', default="100,1000,5000,20000")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            print(f"{'total_spots':>12} {'orm loop (s)':>14} {'bulk (s)':>10} {'speedup':>8}")
+            for size in sizes:
+                legacy = time_lot_creation(legacy_add, size)
+                bulk = time_lot_creation(bulk_add, size)
+                print(f"{size:>12} {legacy:>14.4f} {bulk:>10.4f} {legacy / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import create_app
+from models import db, Lot
+from services.search import create_search_index, search_lots
+
+WORDS = ["MG", "Brigade", "Park", "Church", "Residency", "Station", "Market", "Lake", "Temple", "Airport",
+         "Ring", "Main", "Cross", "Tower", "Mall", "Gate", "Hill", "Garden", "Bridge", "Harbour"]
+TERMS = ["brigade", "tower mall", "5600", "har", "airport gate", "nomatch"]
+
+
+def seed(count, rng):
+    rows = [
+        {
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} Parking {i}",
+            "address": f"{rng.randint(1, 999)} {rng.choice(WORDS)} {rng.choice(WORDS)} Road",
+            "pincode": f"{rng.randint(100000, 999999)}",
+            "price_per_hour": 10,
+            "total_spots": 0,
+            "is_active": True,
+        }
+        for i in range(count)
+    ]
+    db.session.execute(insert(Lot), rows)
+    db.session.commit()
+    with db.engine.begin() as conn:
+        create_search_index(conn)
+
+
+def time_search(term, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        matches = search_lots(term).filter(Lot.is_active == True).all()
+    return (time.perf_counter() - started) / repeat * 1000, len(matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 lot search against the ILIKE fallback.")
+    parser.add_argument('--lots', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'search.db')}"})
+        with app.app_context():
+            seed(args.lots, random.Random(42))
+            print(f"lots={args.lots}")
+            print(f"{'term':>14} {'matches':>8} {'ilike ms':>10} {'fts ms':>10} {'speedup':>8}")
+            for term in TERMS:
+                app.extensions['lot_search'] = False
+                ilike_ms, _ = time_search(term, args.repeat)
+                app.extensions['lot_search'] = True
+                fts_ms, fts_matches = time_search(term, args.repeat)
+                print(f"{term:>14} {fts_matches:>8} {ilike_ms:>10.2f} {fts_ms:>10.2f} {ilike_ms / fts_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
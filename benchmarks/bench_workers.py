@@ -0,0 +1,205 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from benchmarks.generate import PASSWORD, user_email
+
+# name -> relative weight in the request mix
+SCENARIOS = {
+    "user_dashboard": 45,
+    "lots": 35,
+    "book_release": 20,
+}
+
+
+class Client:
+    # One keep-alive HTTP connection carrying a session cookie.
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, payload=None):
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers["Content-Type"] = "application/json"
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return response.status, data
+
+
+def wait_for_port(port, process, seconds=60):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"gunicorn exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("gunicorn did not start listening")
+
+
+def client(port, index, user_index, lot_ids, deadline, samples, errors, lock, seed):
+    rng = random.Random(seed + index)
+    session = Client(port)
+    status, _ = session.request("POST", "/api/v1/session", {"email": user_email(user_index), "password": PASSWORD})
+    if status != 200:
+        with lock:
+            errors["login"] = errors.get("login", 0) + 1
+        return
+    names, weights = zip(*SCENARIOS.items())
+    plate = f"BW{index:04d}"
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        if name == "user_dashboard":
+            calls = [("GET", "/user/dashboard", None, (200,))]
+        elif name == "lots":
+            calls = [("GET", "/api/v1/lots", None, (200,))]
+        else:
+            calls = [
+                ("POST", f"/api/v1/lots/{rng.choice(lot_ids)}/reservations", {"vehicle_number": plate}, (201, 409)),
+                ("POST", "/api/v1/releases", {"vehicle_number": plate}, (200, 404)),
+            ]
+        for method, path, payload, expected in calls:
+            started = time.perf_counter()
+            status, _ = session.request(method, path, payload)
+            seconds = time.perf_counter() - started
+            with lock:
+                if status in expected:
+                    samples.append(seconds)
+                else:
+                    errors[name] = errors.get(name, 0) + 1
+
+
+def consistency(path):
+    # Every worker wrote through its own engine and cache; the rows must still agree.
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        doubled = conn.execute(text(
+            "SELECT COUNT(*) FROM (SELECT spot_id FROM reserve WHERE end_time IS NULL GROUP BY spot_id HAVING COUNT(*) > 1)"
+        )).scalar()
+        drifted = conn.execute(text(
+            "SELECT COUNT(*) FROM lot_availability a WHERE a.available != "
+            "(SELECT COUNT(*) FROM parkingspot s WHERE s.lot_id = a.lot_id AND s.status = 0)"
+        )).scalar()
+    engine.dispose()
+    return {"double_booked_spots": doubled, "drifted_lots": drifted}
+
+
+def run(args, workers, scratch):
+    path = os.path.join(scratch, f"workers-{workers}.db")
+    shutil.copy(args.db, path)
+    env = dict(
+        os.environ,
+        SECRET_KEY="bench-workers",
+        DATABASE_URL=f"sqlite:///{path}",
+        WEB_CONCURRENCY=str(workers),
+        WEB_THREADS=str(args.threads),
+        BIND=f"127.0.0.1:{args.port}",
+        CACHE_PATH=os.path.join(scratch, f"cache-{workers}.db"),
+        RESPONSE_CACHE_PATH=os.path.join(scratch, f"pages-{workers}.db"),
+        TEMPLATE_CACHE_DIR=os.path.join(scratch, "jinja"),
+        RECONCILE_LOCK_FILE=os.path.join(scratch, "reconcile.lock"),
+        RECONCILE_INTERVAL="0",
+    )
+    env.pop("CACHE_BACKEND", None)
+    log = open(os.path.join(scratch, f"gunicorn-{workers}.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_for_port(args.port, process)
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.connect() as conn:
+            lot_ids = [lot_id for (lot_id,) in conn.execute(text("SELECT id FROM parkinglot WHERE is_active = 1"))]
+            user_count = conn.execute(text("SELECT COUNT(*) FROM user WHERE id != 0")).scalar()
+        engine.dispose()
+
+        samples, errors, lock = [], {}, threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=client, args=(args.port, i, i % user_count, lot_ids, deadline,
+                                                  samples, errors, lock, args.seed))
+            for i in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+        log.close()
+
+    latencies = np.array(samples or [0.0]) * 1000
+    return {
+        "workers": workers,
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "clean_exit": process.returncode == 0,
+        **consistency(path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of gunicorn.conf.py as the worker count grows.")
+    parser.add_argument('--db', required=True, help="database produced by benchmarks/generate.py; copied per run")
+    parser.add_argument('--workers', default="1,2,4", help="comma separated worker counts")
+    parser.add_argument('--threads', type=int, default=4, help="threads per worker")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="write the JSON report here")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-workers-")
+    try:
+        results = [run(args, int(workers), scratch) for workers in args.workers.split(",")]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    base = results[0]["throughput_rps"] or 1
+    print(f"{'workers':>8} {'rps':>10} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'doubled':>8} {'drifted':>8}")
+    for row in results:
+        print(f"{row['workers']:>8} {row['throughput_rps']:>10} {row['throughput_rps'] / base:>8.2f} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {sum(row['errors'].values()):>7} {row['double_booked_spots']:>8} {row['drifted_lots']:>8}")
+    print(f"cpus: {os.cpu_count()}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "results": results}, f, indent=2)
+    if any(row["double_booked_spots"] or row["drifted_lots"] or not row["clean_exit"] for row in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import Reserve
+
+LOTS = 6
+BOOKINGS = 12
+
+
+def run(client, method, url, **kwargs):
+    response = client.open(url, method=method, **kwargs)
+    timing = response.headers.get('Server-Timing', '')
+    match = re.search(r'"(\d+) queries"', timing)
+    print(f"{response.status_code} {method:4} {url:45} {match.group(1) if match else '?':>3} queries")
+    return response
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'budgets.db')}",
+            'TESTING': True,
+            'SERVER_TIMING': True,
+            'ENFORCE_QUERY_BUDGETS': True,
+        })
+        admin = app.test_client()
+        user = app.test_client()
+
+        # Enough lots, spots and history that an N+1 shows up as a budget breach.
+        run(admin, "POST", "/login", data={'email': 'admin@email.com', 'password': 'admin'})
+        for i in range(LOTS):
+            run(admin, "POST", "/admin/add_lot", data={'name': f'Lot {i}', 'price': '10', 'address': f'{i} Main Road',
+                                                       'pincode': f'56000{i}', 'max': '20'})
+        run(admin, "POST", "/admin/edit_lot/1", data={'name': 'Lot 0', 'price': '12', 'address': '0 Main Road',
+                                                      'pincode': '560000', 'max': '25'})
+        run(user, "POST", "/register", data={'name': 'budget', 'email': 'budget@email.com', 'password': 'x'})
+        run(user, "POST", "/login", data={'email': 'budget@email.com', 'password': 'x'})
+
+        for i in range(BOOKINGS):
+            run(user, "GET", f"/user/book/{i % LOTS + 1}")
+            run(user, "POST", f"/user/book/{i % LOTS + 1}", data={'vehicle_number': f'KA01{i:04d}'})
+        with app.app_context():
+            reservation_ids = [r.id for r in Reserve.query.order_by(Reserve.id).limit(BOOKINGS // 2)]
+            open_spot = Reserve.query.filter(Reserve.end_time.is_(None)).order_by(Reserve.id.desc()).first().spot_id
+        for reservation_id in reservation_ids:
+            run(user, "GET", f"/user/release/{reservation_id}")
+            run(user, "POST", f"/user/release/{reservation_id}")
+
+        for client, url in [
+            (user, "/user/dashboard"), (user, "/user/dashboard?q=main"), (user, "/user/reservations"),
+            (user, "/user/dashboard/summary"), (admin, "/admin/dashboard"), (admin, "/admin/lot/1/spots"),
+            (admin, "/admin/dashboard/summary"), (admin, "/admin/analytics/occupancy"), (admin, "/admin/dashboard/users"),
+            (admin, "/admin/user/1/reservations"),
+            (admin, "/admin/dashboard/search?filter_by=location&query=main"), (admin, f"/admin/spot/{open_spot}"),
+            (admin, f"/admin/spot/{open_spot}/details"), (admin, "/edit_profile"),
+        ]:
+            run(client, "GET", url)
+        run(admin, "POST", "/admin/spot/25/delete")
+
+        gate = app.test_client()
+        run(gate, "POST", "/api/v1/session", json={'email': 'budget@email.com', 'password': 'x'})
+        run(gate, "GET", "/api/v1/lots")
+        for i in range(3):
+            run(gate, "POST", f"/api/v1/lots/{i + 2}/reservations", json={'vehicle_number': f'KA02{i:04d}'})
+            run(gate, "POST", "/api/v1/releases", json={'vehicle_number': f'KA02{i:04d}'})
+        run(admin, "GET", "/admin/delete_lot/6")
+
+    print("OK: every request stayed within its query budget")
+
+
+if __name__ == "__main__":
+    main()
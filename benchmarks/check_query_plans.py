@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from sqlalchemy import func, literal_column, or_, select
+from app import create_app
+from models import db, Lot, Spot, Reserve, LotAvailability, LotHourlyOccupancy
+from services.archive import reservation_history
+
+# The hot filters issued by controllers/auth.py and the services behind it.
+HOT_QUERIES = {
+    "claim_spot candidates": select(Spot.id).where(Spot.lot_id == 1, Spot.status == False).order_by(Spot.id).limit(16),
+    "refresh_lot counter": select(func.count(Spot.id), func.min(Spot.id)).where(Spot.lot_id == 1, Spot.status == False),
+    "edit_lot occupied count": select(func.count(Spot.id)).where(Spot.lot_id == 1, Spot.status == True),
+    "view_occupied_spot latest": select(Reserve).where(Reserve.spot_id == 1).order_by(Reserve.start_time.desc()).limit(1),
+    "user_reservations": (
+        reservation_history(["id", "location", "start_time"], lambda model: [model.user_id == 1])
+        .order_by(literal_column("start_time").desc(), literal_column("id").desc()).limit(51)
+    ),
+    # Dashboards read lots through services/catalog.py; these are its cache-miss loaders.
+    "catalog active_lot_ids": select(Lot.id).where(Lot.is_active == True).order_by(Lot.id),
+    "catalog load_lots": select(Lot).where(Lot.id.in_([1, 2, 3])),
+    "catalog load_availability": select(LotAvailability).where(LotAvailability.lot_id.in_([1, 2, 3])),
+    "find_open_reservation plate": select(Reserve).where(Reserve.vehicle_number == "KA01AB1234", Reserve.end_time.is_(None)),
+    "fold_occupancy window": (
+        select(Spot.lot_id, Reserve.start_time, Reserve.end_time)
+        .join(Spot, Spot.id == Reserve.spot_id)
+        .where(Reserve.start_time < datetime(2024, 1, 2), or_(Reserve.end_time.is_(None), Reserve.end_time > datetime(2024, 1, 1)))
+    ),
+    "archive_reservations batch": (
+        select(Reserve.id).where(Reserve.end_time < datetime(2024, 1, 1), Reserve.id < 1000).order_by(Reserve.end_time).limit(500)
+    ),
+    "occupancy_heatmap buckets": select(LotHourlyOccupancy).where(
+        LotHourlyOccupancy.hour >= datetime(2024, 1, 1), LotHourlyOccupancy.hour < datetime(2024, 1, 29)
+    ),
+}
+
+
+def full_scans(conn, statement):
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return plan, [step for step in plan if step.startswith("SCAN") and "INDEX" not in step]
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'plans.db')}"})
+        with app.app_context(), db.engine.connect() as conn:
+            for name, statement in HOT_QUERIES.items():
+                plan, scans = full_scans(conn, statement)
+                print(f"{'FAIL' if scans else 'ok  '} {name}: {' | '.join(plan)}")
+                failed = failed or bool(scans)
+
+    if failed:
+        print("A hot query regressed to a full table scan.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
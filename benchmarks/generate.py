@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+from app import create_app
+from models import db, User, Lot, Reserve
+from services.availability import rebuild_availability
+from services.billing import compute_costs, tariff
+from services.provisioning import add_spots
+from services.reporting import rebuild_daily_rollups
+from services.search import create_search_index
+
+WORDS = ["MG", "Brigade", "Park", "Church", "Residency", "Station", "Market", "Lake", "Temple", "Airport",
+         "Ring", "Main", "Cross", "Tower", "Mall", "Gate", "Hill", "Garden", "Bridge", "Harbour"]
+PASSWORD = "loadtest"
+CHUNK = 50_000
+
+
+def user_email(index):
+    return f"user{index}@load.test"
+
+
+def generate(app, lots, spots_per_lot, users, reservations, open_fraction, days, seed):
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    with app.app_context():
+        password = generate_password_hash(PASSWORD)
+        for offset in range(0, users, CHUNK):
+            db.session.execute(insert(User), [
+                {"name": f"User {i}", "email": user_email(i), "password": password, "phone": None,
+                 "address": None, "pincode": None, "is_admin": False}
+                for i in range(offset, min(offset + CHUNK, users))
+            ])
+        user_ids = np.array([user_id for (user_id,) in db.session.query(User.id).filter(User.id != 0).order_by(User.id)])
+
+        prices = rng.choice([10.0, 15.0, 20.0, 30.0, 50.0], size=lots)
+        for i in range(lots):
+            words = rng.choice(WORDS, size=4)
+            lot = Lot(
+                name=f"{words[0]} {words[1]} Parking {i}",
+                price_per_hour=float(prices[i]),
+                address=f"{rng.integers(1, 999)} {words[2]} {words[3]} Road",
+                pincode=str(rng.integers(100000, 999999)),
+                total_spots=spots_per_lot,
+            )
+            db.session.add(lot)
+            db.session.flush()
+            add_spots(lot.id, 1, spots_per_lot)
+        db.session.commit()
+
+        # Spots were inserted lot by lot, so spot ids map to lots arithmetically.
+        first_spot = db.session.execute(text("SELECT MIN(id) FROM parkingspot")).scalar()
+        first_lot = db.session.execute(text("SELECT MIN(id) FROM parkinglot")).scalar()
+        total_spots = lots * spots_per_lot
+        rules = tariff()
+
+        for offset in range(0, reservations, CHUNK):
+            size = min(CHUNK, reservations - offset)
+            spot_index = rng.integers(0, total_spots, size=size)
+            starts = np.datetime64(now - timedelta(days=days)) + rng.integers(0, days * 86400, size=size).astype('timedelta64[s]')
+            durations = np.maximum(rng.exponential(2.5 * 3600, size=size), 300).astype('timedelta64[s]')
+            ends = np.minimum(starts + durations, np.datetime64(now))
+            rates = prices[spot_index // spots_per_lot]
+            costs = compute_costs(starts, ends, rates, **rules)
+            owners = rng.choice(user_ids, size=size)
+
+            db.session.execute(insert(Reserve), [
+                {"spot_id": int(first_spot + s), "user_id": int(u), "start_time": st.astype(datetime),
+                 "end_time": en.astype(datetime), "cost_per_hour": float(r), "total_cost": float(c),
+                 "vehicle_number": f"KA{plate:02d}X{int(u) % 10000:04d}"}
+                for s, u, st, en, r, c, plate in zip(spot_index, owners, starts, ends, rates, costs, owners % 100)
+            ])
+            db.session.commit()
+
+        # A slice of spots is currently occupied by an open reservation.
+        occupied = rng.choice(total_spots, size=int(total_spots * open_fraction), replace=False)
+        open_rows = [
+            {"spot_id": int(first_spot + s), "user_id": int(rng.choice(user_ids)),
+             "start_time": now - timedelta(seconds=int(rng.integers(60, 6 * 3600))), "end_time": None,
+             "cost_per_hour": float(prices[s // spots_per_lot]), "total_cost": None, "vehicle_number": f"OPEN{s:07d}"}
+            for s in occupied
+        ]
+        for offset in range(0, len(open_rows), CHUNK):
+            db.session.execute(insert(Reserve), open_rows[offset:offset + CHUNK])
+        db.session.execute(text("UPDATE parkingspot SET was_occupied = 1 WHERE id IN (SELECT spot_id FROM reserve)"))
+        db.session.execute(text("UPDATE parkingspot SET status = 1 WHERE id IN (SELECT spot_id FROM reserve WHERE end_time IS NULL)"))
+        db.session.commit()
+
+        rebuild_availability()
+        rebuild_daily_rollups()
+        with db.engine.begin() as conn:
+            create_search_index(conn)
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        return first_lot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with seeded synthetic parking data.")
+    parser.add_argument('--db', required=True, help="SQLite file to create")
+    parser.add_argument('--lots', type=int, default=100)
+    parser.add_argument('--spots-per-lot', type=int, default=100)
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--reservations', type=int, default=100_000)
+    parser.add_argument('--open-fraction', type=float, default=0.3)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        sys.exit(f"{args.db} already exists")
+
+    started = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.abspath(args.db)}"})
+    generate(app, args.lots, args.spots_per_lot, args.users, args.reservations, args.open_fraction, args.days, args.seed)
+    print(f"generated {args.lots} lots, {args.lots * args.spots_per_lot} spots, {args.users} users, "
+          f"{args.reservations} reservations in {time.perf_counter() - started:.1f}s -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app import create_app
+from models import db, Lot, Reserve, User
+from benchmarks.generate import PASSWORD, WORDS, user_email
+
+# name -> relative weight in the request mix
+SCENARIOS = {
+    "user_dashboard": 30,
+    "user_search": 15,
+    "book_release": 20,
+    "admin_dashboard": 10,
+    "admin_summary": 5,
+    "admin_search": 10,
+    "user_reservations": 10,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in SCENARIOS}
+        self.errors = {name: 0 for name in SCENARIOS}
+
+    def record(self, name, seconds, queries, ok):
+        with self.lock:
+            if ok:
+                self.samples[name].append((seconds, queries))
+            else:
+                self.errors[name] += 1
+
+
+def timed(recorder, name, call, expected=(200, 302)):
+    started = time.perf_counter()
+    response = call()
+    seconds = time.perf_counter() - started
+    match = re.search(r'"(\d+) queries"', response.headers.get('Server-Timing', ''))
+    # A redirect to the login page means the client was signed out, not a success.
+    signed_out = response.status_code == 302 and response.location.endswith("/login")
+    recorder.record(name, seconds, int(match.group(1)) if match else 0,
+                    response.status_code in expected and not signed_out)
+    return response
+
+
+def worker(app, index, user_index, lot_ids, deadline, recorder, seed):
+    rng = random.Random(seed + index)
+    user = app.test_client()
+    user.post("/login", data={'email': user_email(user_index), 'password': PASSWORD})
+    with user.session_transaction() as session:
+        user_id = session.get('user_id')
+    if user_id is None:
+        raise RuntimeError(f"could not sign in as {user_email(user_index)}")
+    admin = app.test_client()
+    admin.post("/login", data={'email': 'admin@email.com', 'password': 'admin'})
+    names, weights = zip(*SCENARIOS.items())
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        if name == "user_dashboard":
+            timed(recorder, name, lambda: user.get("/user/dashboard"))
+        elif name == "user_search":
+            timed(recorder, name, lambda: user.get(f"/user/dashboard?q={rng.choice(WORDS).lower()[:4]}"))
+        elif name == "user_reservations":
+            timed(recorder, name, lambda: user.get("/user/reservations"))
+        elif name == "admin_dashboard":
+            timed(recorder, name, lambda: admin.get("/admin/dashboard"))
+        elif name == "admin_summary":
+            timed(recorder, name, lambda: admin.get("/admin/dashboard/summary"))
+        elif name == "admin_search":
+            timed(recorder, name, lambda: admin.get(
+                f"/admin/dashboard/search?filter_by=location&query={rng.choice(WORDS).lower()}"))
+        elif name == "book_release":
+            lot_id = rng.choice(lot_ids)
+            timed(recorder, name, lambda: user.post(f"/user/book/{lot_id}", data={'vehicle_number': f"LT{index:04d}"}))
+            with app.app_context():
+                reservation = (
+                    Reserve.query.filter(Reserve.user_id == user_id, Reserve.end_time.is_(None))
+                    .order_by(Reserve.id.desc()).first()
+                )
+                reservation_id = reservation.id if reservation else None
+            if reservation_id:
+                timed(recorder, name, lambda: user.post(f"/user/release/{reservation_id}"))
+
+
+def summarize(recorder, seconds):
+    scenarios = {}
+    all_latencies, all_queries, all_errors = [], [], 0
+    for name in SCENARIOS:
+        samples = recorder.samples[name]
+        all_errors += recorder.errors[name]
+        if not samples:
+            continue
+        latencies = np.array([s for s, _ in samples]) * 1000
+        queries = np.array([q for _, q in samples])
+        all_latencies.append(latencies)
+        all_queries.append(queries)
+        scenarios[name] = {
+            "requests": len(samples),
+            "errors": recorder.errors[name],
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "throughput_rps": round(len(samples) / seconds, 2),
+            "queries_per_request": round(float(queries.mean()), 2),
+        }
+
+    latencies = np.concatenate(all_latencies) if all_latencies else np.zeros(1)
+    queries = np.concatenate(all_queries) if all_queries else np.zeros(1)
+    total = {
+        "requests": int(sum(s["requests"] for s in scenarios.values())),
+        "errors": all_errors,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "throughput_rps": round(sum(s["requests"] for s in scenarios.values()) / seconds, 2),
+        "queries_per_request": round(float(queries.mean()), 2),
+    }
+    return scenarios, total
+
+
+def compare(report, baseline):
+    print(f"\n{'scenario':>18} {'p95 ms':>18} {'rps':>18} {'queries/req':>18}")
+    rows = dict(report["scenarios"], total=report["total"])
+    old_rows = dict(baseline["scenarios"], total=baseline["total"])
+    for name, row in rows.items():
+        old = old_rows.get(name)
+        if not old:
+            continue
+        cells = [f"{old[key]:>7} -> {row[key]:<7}" for key in ("p95_ms", "throughput_rps", "queries_per_request")]
+        print(f"{name:>18} " + " ".join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test through the Flask test client.")
+    parser.add_argument('--db', required=True, help="database produced by benchmarks/generate.py")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--compare', help="earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.abspath(args.db)}", 'SERVER_TIMING': True})
+    with app.app_context():
+        lot_ids = [lot_id for (lot_id,) in db.session.query(Lot.id).filter(Lot.is_active == True)]
+        user_count = User.query.count() - 1
+
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(app, i, i % user_count, lot_ids, deadline, recorder, args.seed))
+        for i in range(args.workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    scenarios, total = summarize(recorder, elapsed)
+    report = {
+        "meta": {"db": os.path.basename(args.db), "workers": args.workers, "seconds": round(elapsed, 2),
+                 "seed": args.seed, "finished_at": datetime.now().isoformat(timespec="seconds")},
+        "scenarios": scenarios,
+        "total": total,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
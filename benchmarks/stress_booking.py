@@ -0,0 +1,118 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from models import db, User, Lot, Spot, Reserve
+from services.availability import drifted_lots, refresh_lot
+from services.reservations import open_reservation
+
+
+def make_app(path):
+    # The default SQLITE_PRAGMAS already put the database in WAL mode.
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == 'wal'
+    return app
+
+
+def seed(app, lots, spots):
+    with app.app_context():
+        user = User(name='stress', email='stress@email.com', password='x')
+        db.session.add(user)
+        for i in range(lots):
+            lot = Lot(name=f'Lot {i}', price_per_hour=10, address='Stress Rd', pincode='000000', total_spots=spots)
+            db.session.add(lot)
+            db.session.flush()
+            db.session.add_all(Spot(lot_id=lot.id, spot_number=f"Spot {n + 1}", status=False) for n in range(spots))
+            refresh_lot(lot.id)
+        db.session.commit()
+        return user.id, [lot.id for lot in Lot.query.all()]
+
+
+def worker(app, index, user_id, lot_ids, attempts, stats, lock):
+    # Books through the same service call the views use, so the savepointed
+    # insert and the counter update are exercised along with the claim.
+    booked = full = retries = 0
+    with app.app_context():
+        for i in range(attempts):
+            lot_id = lot_ids[i % len(lot_ids)]
+            while True:
+                try:
+                    reservation = open_reservation(lot_id, 10, user_id, f'T{index:03d}N{i:06d}')
+                    if reservation is None:
+                        db.session.rollback()
+                        full += 1
+                        break
+                    db.session.commit()
+                    booked += 1
+                    break
+                except OperationalError:
+                    db.session.rollback()
+                    retries += 1
+    with lock:
+        stats['booked'] += booked
+        stats['full'] += full
+        stats['retries'] += retries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test against SQLite in WAL mode.")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--lots', type=int, default=2)
+    parser.add_argument('--spots', type=int, default=200)
+    parser.add_argument('--oversubscribe', type=float, default=1.25, help="booking attempts per available spot")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'stress.db'))
+        user_id, lot_ids = seed(app, args.lots, args.spots)
+
+        attempts = int(args.lots * args.spots * args.oversubscribe / args.threads) + 1
+        stats = {'booked': 0, 'full': 0, 'retries': 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=worker, args=(app, i, user_id, lot_ids, attempts, stats, lock)) for i in range(args.threads)]
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            double_booked = (
+                db.session.query(Reserve.spot_id)
+                .filter(Reserve.end_time.is_(None))
+                .group_by(Reserve.spot_id)
+                .having(func.count(Reserve.id) > 1)
+                .count()
+            )
+            occupied = Spot.query.filter_by(status=True).count()
+            open_reservations = Reserve.query.filter(Reserve.end_time.is_(None)).count()
+            drifted = len(drifted_lots())
+
+        print(f"threads={args.threads} lots={args.lots} spots/lot={args.spots}")
+        print(f"booked={stats['booked']} rejected_full={stats['full']} lock_retries={stats['retries']}")
+        print(f"elapsed={elapsed:.3f}s throughput={stats['booked'] / elapsed:.1f} bookings/s")
+        print(f"double_bookings={double_booked} occupied_spots={occupied} open_reservations={open_reservations} "
+              f"drifted_lots={drifted}")
+
+        if double_booked or occupied != open_reservations or stats['booked'] != occupied:
+            print("FAIL: allocator handed out a spot more than once")
+            sys.exit(1)
+        if drifted:
+            print("FAIL: lot_availability counters drifted from the spots")
+            sys.exit(1)
+        print("OK: zero double bookings, counters match the spots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_secret(name):
+    # NAME, or the contents of the file named by NAME_FILE (Docker/Kubernetes secrets).
+    if os.environ.get(name):
+        return os.environ[name]
+    if os.environ.get(f'{name}_FILE'):
+        with open(os.environ[f'{name}_FILE']) as secret:
+            return secret.read().strip()
+    return None
+
+
+class Config:
+    # Signs session cookies, so every worker must share it. Required by wsgi.py;
+    # the development server falls back to a fixed, public key.
+    SECRET_KEY = env_secret('SECRET_KEY')
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///parking.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Applied to every new SQLite connection. WAL lets readers run alongside the
+    # single writer, and NORMAL sync is durable under WAL except on power loss.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'cache_size': -env_int('SQLITE_CACHE_KB', 64 * 1024),
+        'temp_store': 'MEMORY',
+    }
+
+    # Lot catalog / availability cache. The default LocalCache lives in one
+    # process; with several workers use services.cache.SQLiteCache (a file
+    # at CACHE_PATH shared by every process on the host) or another shared
+    # CacheBackend.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'services.cache.LocalCache')
+    CACHE_MAX_ENTRIES = env_int('CACHE_MAX_ENTRIES', 10000)
+    CACHE_TTL = env_int('CACHE_TTL', 300)
+    CACHE_OPTIONS = (
+        {'path': os.environ.get('CACHE_PATH', os.path.join(INSTANCE_DIR, 'cache.db'))}
+        if CACHE_BACKEND == 'services.cache.SQLiteCache' else {}
+    )
+
+    # Dashboards and search pages are cached per user and URL and answered with
+    # 304 Not Modified until a write bumps the data version, or for at most
+    # RESPONSE_CACHE_SECONDS (0 = off). HTML and JSON responses of at least
+    # COMPRESS_MIN_SIZE bytes (0 = off) are gzip, or brotli when installed,
+    # compressed. TEMPLATE_CACHE_DIR keeps compiled templates on disk.
+    RESPONSE_CACHE_SECONDS = env_int('RESPONSE_CACHE_SECONDS', 60)
+    # Pages live in their own CACHE_BACKEND instance, at most
+    # RESPONSE_CACHE_MAX_ENTRIES of them (a separate file for SQLiteCache).
+    RESPONSE_CACHE_MAX_ENTRIES = env_int('RESPONSE_CACHE_MAX_ENTRIES', 1000)
+    RESPONSE_CACHE_OPTIONS = (
+        {'path': os.environ.get('RESPONSE_CACHE_PATH', os.path.join(INSTANCE_DIR, 'pages.db'))}
+        if CACHE_BACKEND == 'services.cache.SQLiteCache' else {}
+    )
+    COMPRESS_MIN_SIZE = env_int('COMPRESS_MIN_SIZE', 1024)
+    COMPRESS_LEVEL = env_int('COMPRESS_LEVEL', 6)
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', '')
+
+    # Tariff applied when a reservation is closed. The defaults bill exact
+    # pro-rata hours with no minimum and no daily cap.
+    BILLING_MINIMUM_CHARGE = float(os.environ.get('BILLING_MINIMUM_CHARGE', 0))
+    BILLING_ROUND_UP_HOURS = os.environ.get('BILLING_ROUND_UP_HOURS', '') == '1'
+    BILLING_DAILY_CAP = float(os.environ['BILLING_DAILY_CAP']) if os.environ.get('BILLING_DAILY_CAP') else None
+
+    # Password hashing. Changing the method upgrades each stored hash the next
+    # time its owner logs in. Hashes run on a pool of PASSWORD_HASH_WORKERS
+    # threads (0 = inline), with up to PASSWORD_HASH_QUEUE more callers waiting
+    # at most PASSWORD_HASH_WAIT seconds for a slot.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 2)
+    PASSWORD_HASH_QUEUE = env_int('PASSWORD_HASH_QUEUE', 64)
+    PASSWORD_HASH_WAIT = env_int('PASSWORD_HASH_WAIT', 10)
+
+    # Background reconciler. Every RECONCILE_INTERVAL seconds (0 = off) it fixes
+    # spot status against open reservations and closes or flags
+    # (RESERVATION_EXPIRY_ACTION) reservations open longer than
+    # RESERVATION_MAX_HOURS (0 = never), RECONCILE_BATCH rows per transaction.
+    # Each pass also folds newly completed hours into lot_hourly_occupancy.
+    RECONCILE_INTERVAL = env_int('RECONCILE_INTERVAL', 300)
+    RECONCILE_BATCH = env_int('RECONCILE_BATCH', 500)
+    RECONCILE_PAUSE_MS = env_int('RECONCILE_PAUSE_MS', 50)
+    RESERVATION_MAX_HOURS = env_int('RESERVATION_MAX_HOURS', 0)
+    RESERVATION_EXPIRY_ACTION = os.environ.get('RESERVATION_EXPIRY_ACTION', 'flag')
+    # With several workers only the one holding this lock runs the passes.
+    RECONCILE_LOCK_FILE = os.environ.get('RECONCILE_LOCK_FILE', os.path.join(INSTANCE_DIR, 'reconciler.lock'))
+
+    # Reconciler passes also move reservations closed more than
+    # ARCHIVE_AFTER_DAYS ago (0 = never) into reserve_archive.
+    ARCHIVE_AFTER_DAYS = env_int('ARCHIVE_AFTER_DAYS', 90)
+
+    # /metrics counters live in each process. With several workers, each one
+    # publishes them every METRICS_PUBLISH_SECONDS to a SQLite file at
+    # METRICS_PATH shared by the host, and /metrics adds them all up.
+    METRICS_PATH = os.environ.get('METRICS_PATH', '')
+    METRICS_PUBLISH_SECONDS = env_int('METRICS_PUBLISH_SECONDS', 5)
+    # /metrics (which includes slow SQL text) is served to admins, and to
+    # scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+    METRICS_TOKEN = env_secret('METRICS_TOKEN')
+
+    # Most operations accepted by one POST /api/v1/batch request.
+    API_BATCH_LIMIT = env_int('API_BATCH_LIMIT', 100)
+
+    # Only used for server databases (PostgreSQL, MySQL, ...).
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
@@ -0,0 +1,200 @@
+from datetime import datetime
+from operator import attrgetter, itemgetter
+from flask import Blueprint, current_app, g, jsonify, request, session
+from sqlalchemy.exc import IntegrityError
+from models import db, User
+from services.catalog import active_lot_ids, lots_by_id, availability_by_id, invalidate_availability
+from services.passwords import HasherBusy, hash_password, rehash_password, verify_password
+from services.principal import load_principal, api_login_required
+from services.reservations import AlreadyReleased, close_reservation, find_open_reservation, open_reservation
+from services.vehicles import normalize_plate
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+api.before_request(load_principal)
+
+# Response schemas are fixed field tuples with getters built once at import,
+# so serialising a record is one C-level call plus a zip.
+LOT_FIELDS = ("id", "name", "address", "pincode", "price_per_hour")
+lot_values = itemgetter(*LOT_FIELDS)
+
+RESERVATION_FIELDS = ("id", "spot_id", "vehicle_number", "start_time", "end_time", "total_cost")
+reservation_values = attrgetter(*RESERVATION_FIELDS)
+
+
+def lot_record(lot, available):
+    record = dict(zip(LOT_FIELDS, lot_values(lot)))
+    record["available"] = available
+    return record
+
+
+def reservation_record(reservation, lot_id):
+    record = dict(zip(RESERVATION_FIELDS, reservation_values(reservation)))
+    record["lot_id"] = lot_id
+    record["start_time"] = reservation.start_time.isoformat()
+    record["end_time"] = reservation.end_time.isoformat() if reservation.end_time else None
+    return record
+
+
+def book(lot_id, vehicle_number):
+    if not vehicle_number:
+        return 400, {"error": "vehicle_number_required"}, None
+    lot = lots_by_id([lot_id]).get(lot_id)
+    if lot is None or not lot["is_active"]:
+        return 404, {"error": "lot_not_found"}, None
+    if find_open_reservation(vehicle_number) is not None:
+        return 409, {"error": "already_parked"}, None
+
+    try:
+        reservation = open_reservation(lot_id, lot["price_per_hour"], g.principal.id, vehicle_number)
+    except IntegrityError:
+        return 409, {"error": "already_parked"}, None
+    if reservation is None:
+        return 409, {"error": "lot_full"}, None
+    db.session.flush()
+    return 201, {"reservation": reservation_record(reservation, lot_id)}, lot_id
+
+
+def release(vehicle_number):
+    if not vehicle_number:
+        return 400, {"error": "vehicle_number_required"}, None
+    owner = None if g.principal.is_admin else g.principal.id
+    reservation = find_open_reservation(vehicle_number, owner)
+    if reservation is None:
+        return 404, {"error": "reservation_not_found"}, None
+
+    try:
+        lot_id = close_reservation(reservation, datetime.now())
+    except AlreadyReleased:
+        return 404, {"error": "reservation_not_found"}, None
+    return 200, {"reservation": reservation_record(reservation, lot_id)}, lot_id
+
+
+def json_payload():
+    # The request body as a dict; None when it is JSON but not an object.
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return {}
+    return payload if isinstance(payload, dict) else None
+
+
+def invalid_payload():
+    return jsonify({"error": "invalid_payload"}), 400
+
+
+def vehicle_number_of(payload):
+    return normalize_plate(str(payload.get("vehicle_number") or ""))
+
+
+def apply_operation(operation):
+    if not isinstance(operation, dict):
+        return 400, {"error": "invalid_operation"}, None
+    action = operation.get("action")
+    if action == "book":
+        lot_id = operation.get("lot_id")
+        if not isinstance(lot_id, int):
+            return 400, {"error": "lot_id_required"}, None
+        return book(lot_id, vehicle_number_of(operation))
+    if action == "release":
+        return release(vehicle_number_of(operation))
+    return 400, {"error": "invalid_operation"}, None
+
+
+def commit(*lot_ids):
+    db.session.commit()
+    for lot_id in set(lot_ids) - {None}:
+        invalidate_availability(lot_id)
+
+
+def single(status, body, lot_id):
+    if status >= 400:
+        db.session.rollback()
+    else:
+        commit(lot_id)
+    return jsonify(body), status
+
+
+@api.route("/session", methods=["POST"])
+def login():
+    payload = json_payload()
+    if payload is None:
+        return invalid_payload()
+    password = payload.get("password") or ""
+    user = db.session.query(User.id, User.name, User.is_admin, User.password).filter_by(email=payload.get("email")).first()
+    # No pooled connection is held while the request waits for the hasher.
+    db.session.rollback()
+    if user is None:
+        return jsonify({"error": "invalid_credentials"}), 401
+
+    try:
+        matches, needs_rehash = verify_password(user.password, password)
+        if needs_rehash:
+            rehash_password(user.id, user.password, hash_password(password))
+    except HasherBusy:
+        return jsonify({"error": "busy"}), 503
+
+    if not matches:
+        return jsonify({"error": "invalid_credentials"}), 401
+
+    session['user_id'] = user.id
+    session['is_admin'] = user.is_admin
+    session['username'] = user.name
+    return jsonify({"user": {"id": user.id, "name": user.name, "is_admin": user.is_admin}})
+
+
+@api.route("/session", methods=["DELETE"])
+def logout():
+    session.clear()
+    return "", 204
+
+
+@api.route("/lots")
+@api_login_required
+def lots():
+    lot_ids = active_lot_ids()
+    catalog = lots_by_id(lot_ids)
+    availability = availability_by_id(lot_ids)
+    return jsonify({"lots": [lot_record(catalog[lot_id], availability[lot_id]["available"]) for lot_id in lot_ids]})
+
+
+@api.route("/lots/<int:lot_id>/reservations", methods=["POST"])
+@api_login_required
+def book_spot(lot_id):
+    payload = json_payload()
+    if payload is None:
+        return invalid_payload()
+    return single(*book(lot_id, vehicle_number_of(payload)))
+
+
+@api.route("/releases", methods=["POST"])
+@api_login_required
+def release_spot():
+    payload = json_payload()
+    if payload is None:
+        return invalid_payload()
+    return single(*release(vehicle_number_of(payload)))
+
+
+@api.route("/batch", methods=["POST"])
+@api_login_required
+def batch():
+    # Apply a gate's queue of book/release operations in order and commit them
+    # together. Each operation reports its own status; a failed one changes nothing.
+    payload = json_payload()
+    if payload is None:
+        return invalid_payload()
+    operations = payload.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations_required"}), 400
+    if len(operations) > current_app.config['API_BATCH_LIMIT']:
+        return jsonify({"error": "too_many_operations", "limit": current_app.config['API_BATCH_LIMIT']}), 413
+
+    results = []
+    touched = []
+    for operation in operations:
+        status, body, lot_id = apply_operation(operation)
+        body["status"] = status
+        results.append(body)
+        touched.append(lot_id)
+
+    commit(*touched)
+    return jsonify({"results": results})
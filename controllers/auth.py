@@ -1,22 +1,54 @@
-from flask import Blueprint, request, render_template, flash, redirect, url_for, session
+from flask import Blueprint, request, render_template, flash, redirect, url_for, session, g, Response, abort, jsonify, stream_with_context
 from models import db, User, Lot, Spot, Reserve
-from werkzeug.security import check_password_hash, generate_password_hash
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from services.availability import refresh_lot
+from services.billing import cost_of
+from services.cache import bump_data_version
+from services.catalog import (
+    active_lot_ids, lots_by_id, availability_by_id, occupancy_by_id, invalidate_lot, invalidate_availability,
+)
+from services.dashboard import lot_spots
+from services.export import (
+    RESERVATION_COLUMNS, REVENUE_COLUMNS, reservation_statement, revenue_statement,
+    reservation_record, revenue_record, stream_csv, stream_ndjson,
+)
+from services.occupancy import occupancy_heatmap
+from services.pagination import reservation_page, user_page
+from services.passwords import HasherBusy, hash_password, rehash_password, verify_password
+from services.principal import load_principal, login_required, admin_required, invalidate_principal
+from services.provisioning import add_spots, remove_spots
+from services.reporting import revenue_by_lot, occupancy_by_lot, parse_day, spend_by_lot
+from services.reservations import AlreadyReleased, close_reservation, find_open_reservation, open_reservation
+from services.responses import cached_page
+from services.search import index_lot, search_lots
+from services.vehicles import locate_vehicle, normalize_plate
 
 api = Blueprint('auth', __name__)
+api.before_request(load_principal)
 
 @api.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form.get("email")
         password = request.form.get("password")
-        user = User.query.filter_by(email=email).first()
+        user = db.session.query(User.id, User.name, User.is_admin, User.password).filter_by(email=email).first()
+        # End the read transaction first: a sign-in queued behind the hasher
+        # must not keep a pooled connection checked out while it waits.
+        db.session.rollback()
 
         if not user:
             flash("User does not exist.")
             return redirect(url_for('auth.login'))
 
-        if not check_password_hash(user.password, password):
+        try:
+            matches, needs_rehash = verify_password(user.password, password)
+            if needs_rehash:
+                rehash_password(user.id, user.password, hash_password(password))
+        except HasherBusy:
+            flash("Too many sign-ins right now, please try again in a moment.")
+            return redirect(url_for('auth.login'))
+
+        if not matches:
             flash("Incorrect password.")
             return redirect(url_for('auth.login'))
         
@@ -49,11 +81,18 @@ def register():
         if User.query.filter_by(email=email).first():
             flash("Email already registered.")
             return redirect(url_for('auth.register'))
+        db.session.rollback()
+
+        try:
+            password_hash = hash_password(password)
+        except HasherBusy:
+            flash("Too many sign-ups right now, please try again in a moment.")
+            return redirect(url_for('auth.register'))
 
         new_user = User(
             name=name,
             email=email,
-            password=generate_password_hash(password),
+            password=password_hash,
             phone=phone,
             address=address,
             pincode=pincode
@@ -61,6 +100,7 @@ def register():
 
         db.session.add(new_user)
         db.session.commit()
+        bump_data_version()
 
         flash("Registration successful! Please log in.")
         return redirect(url_for('auth.login'))
@@ -68,30 +108,45 @@ def register():
     return render_template("register.html")
 
 @api.route("/admin/dashboard")
+@admin_required
+@cached_page
 def admin_dashboard():
-    user_id = session.get("user_id")
-    user = User.query.get(user_id)
-    lots = Lot.query.filter_by(is_active=True).all()
-    return render_template("admin/dashboard.html", lots=lots, user=user, is_admin=True)
+    lot_ids = active_lot_ids()
+    catalog = lots_by_id(lot_ids)
+    occupancy = occupancy_by_id(lot_ids)
+    lots = [dict(catalog[lot_id], **occupancy[lot_id]) for lot_id in lot_ids if lot_id in occupancy]
+    return render_template("admin/dashboard.html", lots=lots, user=g.principal, is_admin=True)
+
+@api.route("/admin/lot/<int:lot_id>/spots")
+@admin_required
+def admin_lot_spots(lot_id):
+    return jsonify({"lot_id": lot_id, "spots": lot_spots(lot_id)})
 
 @api.route("/edit_profile", methods=["GET", "POST"])
+@login_required
 def edit_profile():
-    user_id = session.get("user_id")
-    if user_id is None:
-        flash("You must be logged in to edit your profile.")
-        return redirect("/login")
+    password_hash = None
+    if request.method == "POST" and request.form.get("password"):
+        db.session.rollback()
+        try:
+            password_hash = hash_password(request.form.get("password"))
+        except HasherBusy:
+            flash("Too many requests right now, please try again in a moment.")
+            return redirect(url_for('auth.edit_profile'))
 
-    user = User.query.get_or_404(user_id)
+    user = User.query.get_or_404(g.principal.id)
 
     if request.method == "POST":
         user.name = request.form.get("name")
         user.email = request.form.get("email")
-        user.password = generate_password_hash(request.form.get("password")) if request.form.get("password") else user.password
+        if password_hash:
+            user.password = password_hash
         user.phone = request.form.get("phone")
         user.address = request.form.get("address")
         user.pincode = request.form.get("pincode")
 
         db.session.commit()
+        invalidate_principal(g.principal.id)
         flash("Profile updated successfully!")
         return redirect(url_for('auth.admin_dashboard' if user.is_admin else 'auth.user_dashboard'))
 
@@ -99,6 +154,7 @@ def edit_profile():
 
 
 @api.route('/admin/add_lot', methods=["GET", "POST"])
+@admin_required
 def add_lot():
     if request.method == "POST":
         name = request.form.get("name")
@@ -129,20 +185,19 @@ def add_lot():
         db.session.add(new_lot)
         db.session.flush()
         
-        for i in range(int(total_spots)):
-            spot = Spot(
-                lot_id=new_lot.id,
-                spot_number=f"Spot {i + 1}",
-                status=False
-            )
-            db.session.add(spot)
+        add_spots(new_lot.id, 1, total_spots)
+        refresh_lot(new_lot.id)
+        index_lot(new_lot)
+        lot_id = new_lot.id
         db.session.commit()
+        invalidate_lot(lot_id)
 
         flash("Parking lot created successfully!")
         return redirect(url_for('auth.admin_dashboard'))
     return render_template("admin/add_lot.html")
 
 @api.route('/admin/delete_lot/<int:lot_id>')
+@admin_required
 def delete_lot(lot_id):
     lot = Lot.query.get_or_404(lot_id)
     if any(spot.status for spot in lot.spots):
@@ -151,10 +206,12 @@ def delete_lot(lot_id):
 
     lot.is_active = False
     db.session.commit()
+    invalidate_lot(lot_id)
     flash("Parking lot deactivated successfully!")
     return redirect(url_for('auth.admin_dashboard'))
 
 @api.route('/admin/edit_lot/<int:lot_id>', methods=["GET", "POST"])
+@admin_required
 def edit_lot(lot_id):
     lot = Lot.query.get_or_404(lot_id)
 
@@ -186,49 +243,51 @@ def edit_lot(lot_id):
         old_total_spots = lot.total_spots
 
         if new_total_spots > old_total_spots:
-            for i in range(old_total_spots + 1, new_total_spots + 1):
-                new_spot = Spot(
-                    lot_id=lot.id,
-                    spot_number=f"Spot {i}",
-                    status=False
-                )
-                db.session.add(new_spot)
+            add_spots(lot.id, old_total_spots + 1, new_total_spots)
 
         elif new_total_spots < old_total_spots:
-            extra_spots = Spot.query.filter_by(lot_id=lot.id).order_by(Spot.id.desc()).limit(old_total_spots - new_total_spots).all()
-            for spot in extra_spots:
-                if spot.was_occupied:
-                    flash("Cannot reduce spots. One or more of the last spots were already used before.", "danger")
-                    return redirect(url_for('auth.edit_lot', lot_id=lot.id))
-                db.session.delete(spot)
+            if not remove_spots(lot.id, old_total_spots - new_total_spots):
+                db.session.rollback()
+                flash("Cannot reduce spots. One or more of the last spots were already used before.", "danger")
+                return redirect(url_for('auth.edit_lot', lot_id=lot.id))
 
         lot.total_spots = new_total_spots
+        refresh_lot(lot.id)
+        index_lot(lot)
 
         db.session.commit()
+        invalidate_lot(lot_id)
         flash("Lot updated successfully!")
         return redirect(url_for('auth.admin_dashboard'))
     
     return render_template("admin/edit_lot.html", lot=lot)
 
 @api.route('/admin/spot/<int:spot_id>')
+@admin_required
 def view_spot(spot_id):
     spot = Spot.query.get_or_404(spot_id)
     return render_template("admin/view_spot.html", spot=spot)
 
 @api.route("/admin/spot/<int:spot_id>/details")
+@admin_required
 def view_occupied_spot(spot_id):
     spot = Spot.query.get_or_404(spot_id)
 
-    reservation = Reserve.query.filter_by(spot_id=spot.id).order_by(Reserve.start_time.desc()).first()
+    reservation = (
+        Reserve.query.filter_by(spot_id=spot.id, end_time=None)
+        .order_by(Reserve.start_time.desc())
+        .first()
+    )
+    if reservation is None:
+        flash("This spot has no open reservation.")
+        return redirect(url_for('auth.view_spot', spot_id=spot.id))
 
-    duration = datetime.now() - reservation.start_time
-    hours = duration.total_seconds() / 3600
-    estimated_cost = round(hours * reservation.cost_per_hour, 2)
-    
+    estimated_cost = cost_of(reservation, datetime.now())
 
     return render_template("admin/view_occupied_spot.html", reservation=reservation, estimated_cost=estimated_cost)
 
 @api.route('/admin/spot/<int:spot_id>/delete', methods=["POST"])
+@admin_required
 def delete_spot(spot_id):
     spot = Spot.query.get_or_404(spot_id)
 
@@ -243,37 +302,34 @@ def delete_spot(spot_id):
     lot = spot.lot
     db.session.delete(spot)
     lot.total_spots -= 1
+    lot_id = lot.id
+    refresh_lot(lot_id)
     db.session.commit()
+    invalidate_lot(lot_id)
 
     flash("Spot deleted successfully.")
     return redirect(url_for('auth.admin_dashboard'))
 
 @api.route("/admin/dashboard/users")
+@admin_required
 def admin_users():
-    users = User.query.all()
-    return render_template("admin/users.html", users=users)
+    after = request.args.get("after", type=int)
+    users, next_after = user_page(after)
+    return render_template("admin/users.html", users=users, next_after=next_after, paged=after is not None)
 
 @api.route("/admin/user/<int:user_id>/reservations")
+@admin_required
 def user_parking_history(user_id):
     user = User.query.get_or_404(user_id)
-    
-    reservations = [
-        {
-            "id": r.id,
-            "location": r.spot.lot.name,
-            "address": r.spot.lot.address,
-            "pincode": r.spot.lot.pincode,
-            "vehicle_number": r.vehicle_number,
-            "start_time": r.start_time,
-            "end_time": r.end_time,
-            "cost_per_hour": r.cost_per_hour
-        }
-        for r in Reserve.query.filter_by(user_id=user_id).order_by(Reserve.start_time.desc()).all()
-    ]
-
-    return render_template("admin/user_history.html", user=user, reservations=reservations)
+    cursor = request.args.get("before")
+    reservations, next_cursor = reservation_page(user_id, cursor)
+
+    return render_template("admin/user_history.html", user=user, reservations=reservations,
+                           next_cursor=next_cursor, paged=bool(cursor))
 
 @api.route("/admin/dashboard/search")
+@admin_required
+@cached_page
 def admin_search():
     filter_by = request.args.get("filter_by")
     query = request.args.get("query")
@@ -298,189 +354,207 @@ def admin_search():
                     "name": user.name,
                     "email": user.email
                 })
+        elif filter_by == "vehicle_number":
+            vehicle = locate_vehicle(normalize_plate(query))
+            if vehicle:
+                lot = lots_by_id([vehicle.lot_id]).get(vehicle.lot_id)
+                results.append({
+                    "type": "Vehicle",
+                    "id": vehicle.plate,
+                    "lot_id": vehicle.lot_id,
+                    "lot": lot["name"] if lot else None,
+                    "spot_id": vehicle.spot_id,
+                    "user_id": vehicle.user_id,
+                    "since": vehicle.start_time,
+                })
         elif filter_by == "location":
-            from models import Lot
-            lots = Lot.query.filter(Lot.address.ilike(f"%{query}%")).all()
-            for lot in lots:
+            lot_ids = [lot_id for (lot_id,) in search_lots(query, fields=('address',)).with_entities(Lot.id)]
+            catalog = lots_by_id(lot_ids)
+            availability = availability_by_id([lot_id for lot_id in lot_ids if catalog[lot_id]["is_active"]])
+            for lot_id in lot_ids:
+                lot = catalog[lot_id]
                 results.append({
                     "type": "Lot",
-                    "id": lot.id,
-                    "name": lot.name,
-                    "address": lot.address,
-                    **({"available": sum(1 for s in lot.spots if not s.status)} if lot.is_active else {"status": "inactive"})
+                    "id": lot["id"],
+                    "name": lot["name"],
+                    "address": lot["address"],
+                    **({"available": availability[lot_id]["available"]} if lot["is_active"] else {"status": "inactive"})
                 })
 
     return render_template("admin/search.html", results=results, current_path="/admin/dashboard/search")
 
 @api.route('/admin/dashboard/summary')
+@admin_required
+@cached_page
 def admin_summary():
-    revenue_data = []
-    lots = Lot.query.all()
-
-    for lot in lots:
-        total_revenue = 0
-        for spot in lot.spots:
-            for r in spot.reservations:
-                if r.end_time:
-                    duration_hours = max((r.end_time - r.start_time).total_seconds() / 3600, 0)
-                    total_revenue += duration_hours * r.cost_per_hour
-        if total_revenue > 0:
-            revenue_data.append({'lot': lot.name, 'revenue': round(total_revenue, 2)})
+    start = parse_day(request.args.get("start"))
+    end = parse_day(request.args.get("end"))
+
+    revenue_data = revenue_by_lot(start, end)
 
     # Availability per Lot
-    status_data = []
-    for lot in lots:
-        if lot.is_active:
-            total = len(lot.spots)
-            occupied = sum(1 for spot in lot.spots if spot.status)
-            status_data.append({
-                'lot': lot.name,
-                'available': total - occupied,
-                'occupied': occupied
-            })
+    status_data = occupancy_by_lot()
     return render_template('admin/summary.html',
                            revenue_data=revenue_data,
-                           status_data=status_data)
+                           status_data=status_data,
+                           start=start,
+                           end=end)
+
+@api.route('/admin/analytics/occupancy')
+@admin_required
+def admin_occupancy():
+    weeks = min(max(request.args.get("weeks", 4, type=int), 1), 52)
+    return jsonify(occupancy_heatmap(weeks, request.args.get("lot_id", type=int)))
     
 
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
+
+def export_response(name, statement, columns, to_record):
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    stream, mimetype = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(stream(statement, columns, to_record)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={name}.{export_format}"},
+    )
+
+@api.route('/admin/export/reservations')
+@admin_required
+def export_reservations():
+    statement = reservation_statement(
+        lot_id=request.args.get("lot_id", type=int),
+        user_id=request.args.get("user_id", type=int),
+        start=parse_day(request.args.get("start")),
+        end=parse_day(request.args.get("end")),
+    )
+    return export_response("reservations", statement, RESERVATION_COLUMNS, reservation_record)
+
+@api.route('/admin/export/revenue')
+@admin_required
+def export_revenue():
+    statement = revenue_statement(
+        lot_id=request.args.get("lot_id", type=int),
+        start=parse_day(request.args.get("start")),
+        end=parse_day(request.args.get("end")),
+    )
+    return export_response("revenue", statement, REVENUE_COLUMNS, revenue_record)
+
+
 @api.route("/user/dashboard")
+@login_required
+@cached_page
 def user_dashboard():
-    from sqlalchemy import or_
-    user_id = session.get("user_id")
-    user = User.query.get(user_id)
-    
     query = request.args.get("q", "").strip().lower()
-    lots_query = Lot.query.filter_by(is_active=True)
-
     if query:
-        lots_query = lots_query.filter(
-            or_(
-                Lot.name.ilike(f"%{query}%"),
-                Lot.address.ilike(f"%{query}%"),
-                Lot.pincode.ilike(f"%{query}%")
-            )
-        )
+        lot_ids = [lot_id for (lot_id,) in search_lots(query).with_entities(Lot.id).filter(Lot.is_active == True)]
+    else:
+        lot_ids = active_lot_ids()
 
-    lots = lots_query.all()
+    catalog = lots_by_id(lot_ids)
+    availability = availability_by_id(lot_ids)
     user_lots = []
 
-    for lot in lots:
-        available_spot = Spot.query.filter_by(lot_id=lot.id, status=False).first()
+    for lot_id in lot_ids:
+        lot = catalog[lot_id]
         user_lots.append({
-            "id": lot.id,
-            "name": lot.name,
-            "address": lot.address,
-            "pincode": lot.pincode,
-            "price_per_hour": lot.price_per_hour,
-            "available_spots": Spot.query.filter_by(lot_id=lot.id, status=False).count(),
-            "first_available_spot_id": available_spot.id if available_spot else None
+            "id": lot["id"],
+            "name": lot["name"],
+            "address": lot["address"],
+            "pincode": lot["pincode"],
+            "price_per_hour": lot["price_per_hour"],
+            "available_spots": availability[lot_id]["available"],
+            "first_available_spot_id": availability[lot_id]["first_free_spot_id"]
         })
 
-    return render_template("user/dashboard.html", lots=user_lots, user=user, is_admin=False, query=query)
+    return render_template("user/dashboard.html", lots=user_lots, user=g.principal, is_admin=False, query=query)
 
 
 from datetime import datetime
 
-@api.route("/user/book/<int:spot_id>", methods=["GET", "POST"])
-def book_spot(spot_id):
-    spot = Spot.query.get_or_404(spot_id)
-    lot = Lot.query.get_or_404(spot.lot_id)
-    user_id = session.get('user_id')
+@api.route("/user/book/<int:lot_id>", methods=["GET", "POST"])
+@login_required
+def book_spot(lot_id):
+    lot = Lot.query.get_or_404(lot_id)
+    user_id = g.principal.id
+
+    if not lot.is_active:
+        flash("This parking lot is no longer available.")
+        return redirect(url_for('auth.user_dashboard'))
 
     if request.method == "POST":
-        vehicle_number = request.form.get("vehicle_number")
-        reservation = Reserve(
-            spot_id=spot.id,
-            user_id=user_id,
-            vehicle_number=vehicle_number,
-            start_time=datetime.now(),
-            end_time= None,
-            cost_per_hour=lot.price_per_hour
-        )
-        spot.status = True
-        spot.was_occupied = True
-        db.session.add(reservation)
-        db.session.commit()
+        vehicle_number = normalize_plate(request.form.get("vehicle_number"))
+        if not vehicle_number:
+            flash("Please enter a valid vehicle number.")
+            return redirect(url_for('auth.book_spot', lot_id=lot.id))
+        if find_open_reservation(vehicle_number) is not None:
+            flash("This vehicle is already parked.")
+            return redirect(url_for('auth.user_dashboard'))
+
+        try:
+            reservation = open_reservation(lot.id, lot.price_per_hour, user_id, vehicle_number)
+            if reservation is None:
+                db.session.rollback()
+                flash("No spots available in this lot.")
+                return redirect(url_for('auth.user_dashboard'))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash("This vehicle is already parked.")
+            return redirect(url_for('auth.user_dashboard'))
+
+        invalidate_availability(lot_id)
         flash("Reservation confirmed!")
         return redirect(url_for('auth.user_dashboard'))
 
-    return render_template("user/reserve.html", spot=spot, lot=lot, user_id=user_id,)
+    return render_template("user/reserve.html", lot=lot, user_id=user_id,)
 
 @api.route("/user/reservations")
+@login_required
 def user_reservations():
-    reservations = [
-        {
-            "id": r.id,
-            "location": r.spot.lot.name,
-            "pincode": r.spot.lot.pincode,
-            "address": r.spot.lot.address,
-            "vehicle_number": r.vehicle_number,
-            "start_time": r.start_time,
-            "end_time": r.end_time,
-            "cost_per_hour": r.cost_per_hour,
-        }
-        for r in Reserve.query.filter_by(user_id=session["user_id"]).order_by(Reserve.start_time.desc()).all()
-    ]
-
-    return render_template("user/reservations.html", reservations=reservations)
+    cursor = request.args.get("before")
+    reservations, next_cursor = reservation_page(g.principal.id, cursor)
+
+    return render_template("user/reservations.html", reservations=reservations,
+                           next_cursor=next_cursor, paged=bool(cursor))
 
 @api.route("/user/release/<int:reservation_id>", methods=["GET", "POST"])
+@login_required
 def release_spot(reservation_id):
     reservation = Reserve.query.get_or_404(reservation_id)
+    if reservation.user_id != g.principal.id and not g.principal.is_admin:
+        abort(403)
+    if reservation.end_time:
+        flash("This reservation has already been released.")
+        return redirect(url_for('auth.user_reservations'))
     now = datetime.now()
-    duration = datetime.now() - reservation.start_time
-    hours = duration.total_seconds() / 3600
-    cost = round(hours * reservation.cost_per_hour, 2)
+    cost = cost_of(reservation, now)
 
     if request.method == "POST":
-        reservation.end_time = now
-        spot = Spot.query.get(reservation.spot_id)
-        if spot:
-            spot.status = False
+        try:
+            lot_id = close_reservation(reservation, now)
+        except AlreadyReleased:
+            db.session.rollback()
+            flash("This reservation has already been released.")
+            return redirect(url_for('auth.user_reservations'))
+        cost = reservation.total_cost
         db.session.commit()
+        if lot_id:
+            invalidate_availability(lot_id)
         flash(f"Payment of ${cost} was successful!")
         return redirect(url_for('auth.user_reservations'))
 
     return render_template("user/release.html", reservation=reservation, now=datetime.now(), estimated_cost=cost)
 
 @api.route('/user/dashboard/summary')
+@login_required
+@cached_page
 def user_summary():
-    user_id = session.get('user_id')
-    if not user_id:
-        return redirect(url_for('auth.login'))
-    
-    revenue_data = (
-        db.session.query(
-            Lot.name,
-            func.sum(
-                Reserve.cost_per_hour * (
-                    (func.julianday(Reserve.end_time) - func.julianday(Reserve.start_time)) * 24.0
-                )
-            )
-        )
-        .join(Spot, Spot.lot_id == Lot.id)
-        .join(Reserve, Reserve.spot_id == Spot.id)
-        .filter(Reserve.user_id == user_id)
-        .group_by(Lot.name)
-        .all()
-    )
-    revenue_chart = [{'lot': r[0], 'spent': round(r[1], 2) if r[1] else 0} for r in revenue_data]
-
-    # Spot usage frequency
-    hour_data = (
-        db.session.query(
-            Lot.name,
-            func.sum(
-                (func.julianday(Reserve.end_time) - func.julianday(Reserve.start_time)) * 24.0
-            )
-        )
-        .join(Spot, Spot.lot_id == Lot.id)
-        .join(Reserve, Reserve.spot_id == Spot.id)
-        .filter(Reserve.user_id == user_id)
-        .group_by(Lot.name)
-        .all()
-    )
-    hour_chart = [{'lot': h[0], 'hours': round(h[1], 2) if h[1] else 0} for h in hour_data]
+    revenue_chart, hour_chart = spend_by_lot(g.principal.id)
 
     return render_template('user/summary.html', revenue_data=revenue_chart, hour_data=hour_chart)
 
@@ -0,0 +1,21 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, g, request
+from services.metrics import render_metrics
+from services.principal import load_principal
+
+api = Blueprint('metrics', __name__)
+api.before_request(load_principal)
+
+def scrape_allowed():
+    # A scraper presents METRICS_TOKEN as a bearer token; a signed-in admin
+    # may look without one.
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return True
+    return g.principal is not None and g.principal.is_admin
+
+@api.route("/metrics")
+def metrics():
+    if not scrape_allowed():
+        abort(403)
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,55 @@
+import os
+import sys
+
+# LocalCache would let each worker keep serving entries another worker has
+# invalidated, so default to the host-wide SQLite cache. This has to happen
+# before config.py is imported, since Config reads the environment once.
+# Likewise each worker's /metrics counters are pooled in a shared file.
+if int(os.environ.get('WEB_CONCURRENCY') or 2) > 1:
+    os.environ.setdefault('CACHE_BACKEND', 'services.cache.SQLiteCache')
+    os.environ.setdefault('METRICS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics.db'))
+# The master compiles every template once; workers load the bytecode from here.
+os.environ.setdefault('TEMPLATE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'jinja'))
+
+from config import INSTANCE_DIR, env_int
+
+# Every worker is a separate process with its own SQLAlchemy engine (the app is
+# created after the fork), serving WEB_THREADS requests at a time.
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = env_int('WEB_CONCURRENCY', 2)
+worker_class = 'gthread'
+threads = env_int('WEB_THREADS', 4)
+timeout = env_int('WEB_TIMEOUT', 60)
+graceful_timeout = env_int('WEB_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('WEB_KEEPALIVE', 5)
+max_requests = env_int('WEB_MAX_REQUESTS', 0)
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+preload_app = False
+
+
+def on_starting(server):
+    # Entries cached by a previous run may predate changes made while it was
+    # down, and its workers' metrics belong to a server that no longer runs.
+    for path in (os.environ.get('CACHE_PATH', os.path.join(INSTANCE_DIR, 'cache.db')),
+                 os.environ.get('RESPONSE_CACHE_PATH', os.path.join(INSTANCE_DIR, 'pages.db')),
+                 os.environ.get('METRICS_PATH', '')):
+        if not path:
+            continue
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    # Create the schema, run migrations and seed once in the master, so the
+    # workers booting in parallel find the database ready instead of racing.
+    from app import create_app, shutdown_app
+    shutdown_app(create_app({'RECONCILE_INTERVAL': 0}))
+
+
+def worker_exit(server, worker):
+    # SIGTERM: gunicorn stops accepting, lets in-flight requests finish within
+    # graceful_timeout, then calls this in the worker before it exits.
+    wsgi = sys.modules.get('wsgi')
+    if wsgi is not None and hasattr(wsgi, 'app'):
+        from app import shutdown_app
+        shutdown_app(wsgi.app)
@@ -6,3 +6,6 @@ from .lot import Lot
 from .spot import Spot
 from .reserve import Reserve
 from .user import User
+from .rollup import LotDailyRevenue, LotHourlyOccupancy, RollupWatermark
+from .availability import LotAvailability
+from .archive import ReserveArchive
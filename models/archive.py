@@ -0,0 +1,20 @@
+from . import db
+
+class ReserveArchive(db.Model):
+    __tablename__ = 'reserve_archive'
+    __table_args__ = (
+        db.Index('ix_reserve_archive_user_start', 'user_id', 'start_time'),
+        db.Index('ix_reserve_archive_lot_end', 'lot_id', 'end_time'),
+    )
+    
+    # Closed reservations moved out of `reserve`, keeping their ids. The lot is
+    # stored directly so history never depends on the spot still existing.
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parkinglot.id'), nullable=False)
+    spot_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    cost_per_hour = db.Column(db.Float, nullable=False)
+    vehicle_number = db.Column(db.String(20), nullable=False)
+    total_cost = db.Column(db.Float, nullable=True)
@@ -0,0 +1,8 @@
+from . import db
+
+class LotAvailability(db.Model):
+    __tablename__ = 'lot_availability'
+    
+    lot_id = db.Column(db.Integer, db.ForeignKey('parkinglot.id'), primary_key=True)
+    available = db.Column(db.Integer, nullable=False, default=0)
+    first_free_spot_id = db.Column(db.Integer, nullable=True)
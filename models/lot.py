@@ -2,6 +2,9 @@ from . import db
 
 class Lot(db.Model):
     __tablename__ = 'parkinglot'
+    __table_args__ = (
+        db.Index('ix_parkinglot_is_active', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
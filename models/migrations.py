@@ -0,0 +1,125 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from . import db
+
+
+def create_indexes(conn, table, *names):
+    for index in table.indexes:
+        if index.name in names:
+            if conn.dialect.name == 'sqlite':
+                # Reflection skips expression indexes, so let SQLite check for existence.
+                conn.execute(CreateIndex(index, if_not_exists=True))
+            else:
+                index.create(conn, checkfirst=True)
+
+
+def add_hot_lookup_indexes(conn):
+    from . import Lot, Spot, Reserve
+    create_indexes(conn, Spot.__table__, 'ix_parkingspot_lot_status')
+    create_indexes(conn, Reserve.__table__, 'ix_reserve_spot_start', 'ix_reserve_user_start')
+    create_indexes(conn, Lot.__table__, 'ix_parkinglot_is_active')
+
+
+def add_lot_search_index(conn):
+    from services.search import create_search_index
+    create_search_index(conn)
+
+
+def add_reserve_total_cost(conn):
+    if 'total_cost' not in {column['name'] for column in inspect(conn).get_columns('reserve')}:
+        conn.exec_driver_sql("ALTER TABLE reserve ADD COLUMN total_cost FLOAT")
+
+
+def add_reserve_flagged_at(conn):
+    if 'flagged_at' not in {column['name'] for column in inspect(conn).get_columns('reserve')}:
+        conn.exec_driver_sql("ALTER TABLE reserve ADD COLUMN flagged_at DATETIME")
+
+
+def add_reserve_end_time_index(conn):
+    from . import Reserve
+    create_indexes(conn, Reserve.__table__, 'ix_reserve_end_time')
+
+
+def normalize_vehicle_numbers(conn):
+    from services.vehicles import normalize_plate
+    renames = [
+        {"old": plate, "new": normalize_plate(plate)}
+        for (plate,) in conn.execute(text("SELECT DISTINCT vehicle_number FROM reserve"))
+        if plate != normalize_plate(plate)
+    ]
+    if renames:
+        conn.execute(text("UPDATE reserve SET vehicle_number = :new WHERE vehicle_number = :old"), renames)
+
+
+def unique_open_vehicle_index(conn):
+    # Replace the plain plate index with a unique partial one. Duplicate open
+    # reservations left by the old check-then-insert race keep the earliest
+    # booking; the rest are closed at their start time at no charge.
+    from . import Reserve
+    duplicates = (
+        "FROM reserve WHERE end_time IS NULL AND EXISTS (SELECT 1 FROM reserve AS earlier "
+        "WHERE earlier.vehicle_number = reserve.vehicle_number AND earlier.end_time IS NULL AND earlier.id < reserve.id)"
+    )
+    spot_ids = [spot_id for (spot_id,) in conn.execute(text(f"SELECT spot_id {duplicates}"))]
+    if spot_ids:
+        conn.execute(text(f"UPDATE reserve SET end_time = start_time, total_cost = 0 WHERE id IN (SELECT id {duplicates})"))
+        for spot_id in set(spot_ids):
+            conn.execute(text(
+                "UPDATE parkingspot SET status = 0 WHERE id = :spot_id "
+                "AND NOT EXISTS (SELECT 1 FROM reserve WHERE spot_id = :spot_id AND end_time IS NULL)"
+            ), {"spot_id": spot_id})
+        conn.execute(text(
+            "UPDATE lot_availability SET "
+            "available = (SELECT COUNT(*) FROM parkingspot WHERE lot_id = lot_availability.lot_id AND status = 0), "
+            "first_free_spot_id = (SELECT MIN(id) FROM parkingspot WHERE lot_id = lot_availability.lot_id AND status = 0)"
+        ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_reserve_vehicle_open"))
+    create_indexes(conn, Reserve.__table__, 'ix_reserve_vehicle_open')
+
+
+def recount_daily_revenue(conn):
+    # Concurrent releases of one reservation each folded it into the rollup
+    # before close_reservation was guarded. Empty the table; app startup's
+    # ensure_daily_rollups rebuilds it from the reservations themselves.
+    conn.execute(text("DELETE FROM lot_daily_revenue"))
+
+
+# Ordered, append-only. Each migration runs in its own transaction together with
+# the schema_version row that records it, and must be safe on a database that
+# db.create_all() has just built from the current models.
+MIGRATIONS = [
+    (1, "hot lookup indexes", add_hot_lookup_indexes),
+    (2, "lot full-text search index", add_lot_search_index),
+    (3, "stored reservation cost", add_reserve_total_cost),
+    (4, "overdue reservation flag", add_reserve_flagged_at),
+    (5, "reservation end time index", add_reserve_end_time_index),
+    (6, "normalized vehicle numbers", normalize_vehicle_numbers),
+    (7, "unique open reservation per vehicle", unique_open_vehicle_index),
+    (8, "recount daily revenue", recount_daily_revenue),
+]
+
+
+def current_version(conn):
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def run_migrations():
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        with db.engine.begin() as conn:
+            if version <= current_version(conn):
+                continue
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.now()},
+            )
+            applied.append(version)
+    return applied
@@ -2,6 +2,14 @@ from . import db
 
 class Reserve(db.Model):
     __tablename__ = 'reserve'
+    __table_args__ = (
+        db.Index('ix_reserve_spot_start', 'spot_id', 'start_time'),
+        db.Index('ix_reserve_user_start', 'user_id', 'start_time'),
+        db.Index('ix_reserve_end_time', 'end_time'),
+        # One open reservation per plate.
+        db.Index('ix_reserve_vehicle_open', 'vehicle_number', unique=True,
+                 sqlite_where=db.text('end_time IS NULL'), postgresql_where=db.text('end_time IS NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parkingspot.id'), nullable=False)
@@ -9,4 +17,6 @@ class Reserve(db.Model):
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=True)
     cost_per_hour = db.Column(db.Float, nullable=False)
-    vehicle_number = db.Column(db.String(20), nullable=False)
\ No newline at end of file
+    vehicle_number = db.Column(db.String(20), nullable=False)
+    total_cost = db.Column(db.Float, nullable=True)
+    flagged_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,30 @@
+from . import db
+
+class LotDailyRevenue(db.Model):
+    __tablename__ = 'lot_daily_revenue'
+    
+    lot_id = db.Column(db.Integer, db.ForeignKey('parkinglot.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    hours = db.Column(db.Float, nullable=False, default=0)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+
+
+class LotHourlyOccupancy(db.Model):
+    __tablename__ = 'lot_hourly_occupancy'
+    __table_args__ = (
+        db.Index('ix_lot_hourly_occupancy_hour', 'hour', 'lot_id'),
+    )
+    
+    lot_id = db.Column(db.Integer, db.ForeignKey('parkinglot.id'), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    occupied_hours = db.Column(db.Float, nullable=False, default=0)
+    arrivals = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RollupWatermark(db.Model):
+    __tablename__ = 'rollup_watermark'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    processed_until = db.Column(db.DateTime, nullable=False)
@@ -2,6 +2,9 @@ from . import db
 
 class Spot(db.Model):
     __tablename__ = 'parkingspot'
+    __table_args__ = (
+        db.Index('ix_parkingspot_lot_status', 'lot_id', 'status', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     lot_id = db.Column(db.Integer, db.ForeignKey('parkinglot.id'), nullable=False)
@@ -0,0 +1,49 @@
+import random
+from sqlalchemy import exists, or_, select, update
+from models import db, Spot, Reserve, ReserveArchive
+
+CLAIM_ATTEMPTS = 8
+CANDIDATE_WINDOW = 16
+
+
+def claim_spot(lot_id):
+    # Optimistically claim a free spot with a conditional UPDATE. Candidates are
+    # picked at random from the lowest free ids so concurrent bookings for the
+    # same lot rarely race for the same row; a lost race just tries the next one.
+    # Statements issued after a lost race carry the contention_retry execution
+    # option, so instrumentation can tell contention apart from the first try.
+    retry = False
+    for _ in range(CLAIM_ATTEMPTS):
+        candidates = db.session.execute(
+            select(Spot.id)
+            .where(Spot.lot_id == lot_id, Spot.status == False)
+            .order_by(Spot.id)
+            .limit(CANDIDATE_WINDOW)
+            .execution_options(contention_retry=retry)
+        ).scalars().all()
+        if not candidates:
+            return None
+
+        random.shuffle(candidates)
+        for spot_id in candidates:
+            claimed = db.session.execute(
+                update(Spot)
+                .where(Spot.id == spot_id, Spot.status == False)
+                .values(status=True, was_occupied=True)
+                .execution_options(synchronize_session=False, contention_retry=retry)
+            ).rowcount
+            if claimed:
+                return spot_id
+            retry = True
+    return None
+
+
+def release_claim(spot_id):
+    # Undo claim_spot for a booking that could not go ahead.
+    ever_used = or_(exists().where(Reserve.spot_id == spot_id), exists().where(ReserveArchive.spot_id == spot_id))
+    db.session.execute(
+        update(Spot)
+        .where(Spot.id == spot_id)
+        .values(status=False, was_occupied=ever_used)
+        .execution_options(synchronize_session=False)
+    )
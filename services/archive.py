@@ -0,0 +1,85 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select, union_all
+from models import db, Lot, Spot, Reserve, ReserveArchive, RollupWatermark
+from services.occupancy import WATERMARK
+
+
+def archive_cutoff(days):
+    # Never archive hours the occupancy pipeline has not folded yet.
+    cutoff = datetime.now() - timedelta(days=days)
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    if watermark is not None:
+        cutoff = min(cutoff, watermark.processed_until)
+    return cutoff
+
+
+def archive_reservations(days, batch, pause=0.0):
+    # Move reservations closed more than `days` ago from reserve into
+    # reserve_archive, `batch` rows per transaction, oldest first.
+    cutoff = archive_cutoff(days)
+    # SQLite hands out max(rowid) + 1 for new rows, so the newest row always
+    # stays behind to keep an archived id from being issued again.
+    newest = db.session.query(func.max(Reserve.id)).scalar()
+    moved = 0
+    while newest is not None:
+        ids = db.session.execute(
+            select(Reserve.id)
+            .where(Reserve.end_time < cutoff, Reserve.id < newest)
+            .order_by(Reserve.end_time)
+            .limit(batch)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.session.execute(insert(ReserveArchive).from_select(
+            ['id', 'lot_id', 'spot_id', 'user_id', 'start_time', 'end_time', 'cost_per_hour', 'vehicle_number', 'total_cost'],
+            select(
+                Reserve.id, Spot.lot_id, Reserve.spot_id, Reserve.user_id, Reserve.start_time, Reserve.end_time,
+                Reserve.cost_per_hour, Reserve.vehicle_number, Reserve.total_cost,
+            )
+            .join(Spot, Spot.id == Reserve.spot_id)
+            .where(Reserve.id.in_(ids))
+        ))
+        db.session.execute(
+            delete(Reserve).where(Reserve.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        moved += len(ids)
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def lot_of(model):
+    return Spot.lot_id if model is Reserve else model.lot_id
+
+
+def reservation_history(columns, criteria=lambda model: ()):
+    # UNION ALL of live and archived reservations. `columns` are names of
+    # reservation fields, plus "lot_id", "location", "address", "pincode" and
+    # "spot_number"; criteria(model) returns the filters for either store.
+    lot_columns = {"lot_id": Lot.id, "location": Lot.name, "address": Lot.address, "pincode": Lot.pincode,
+                   "spot_number": Spot.spot_number}
+
+    def pick(model):
+        return [
+            (lot_columns[name] if name in lot_columns else getattr(model, name)).label(name)
+            for name in columns
+        ]
+
+    live = (
+        select(*pick(Reserve))
+        .join(Spot, Spot.id == Reserve.spot_id)
+        .join(Lot, Lot.id == Spot.lot_id)
+        .where(*criteria(Reserve))
+    )
+    archived = (
+        select(*pick(ReserveArchive))
+        .join(Lot, Lot.id == ReserveArchive.lot_id)
+        .where(*criteria(ReserveArchive))
+    )
+    if "spot_number" in columns:
+        archived = archived.outerjoin(Spot, Spot.id == ReserveArchive.spot_id)
+    return union_all(live, archived)
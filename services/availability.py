@@ -0,0 +1,98 @@
+from sqlalchemy import func, case, insert, or_, select, update
+from models import db, Lot, Spot, LotAvailability
+
+
+def _first_free(lot_id, after=None):
+    query = select(func.min(Spot.id)).where(Spot.lot_id == lot_id, Spot.status == False)
+    if after is not None:
+        query = query.where(Spot.id > after)
+    return query.scalar_subquery()
+
+
+def _free_spots(lot_id):
+    return select(func.count(Spot.id)).where(Spot.lot_id == lot_id, Spot.status == False).scalar_subquery()
+
+
+def refresh_lot(lot_id):
+    # Recompute one lot's counter from its spots; used after spots are added or
+    # removed and by the reconciler. One statement, so a booking that commits
+    # meanwhile is never overwritten with the count read before it.
+    db.session.flush()
+    counter = dict(available=_free_spots(lot_id), first_free_spot_id=_first_free(lot_id))
+    updated = db.session.execute(
+        update(LotAvailability)
+        .where(LotAvailability.lot_id == lot_id)
+        .values(**counter)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.session.execute(insert(LotAvailability).values(lot_id=lot_id, **counter))
+
+
+def drifted_lots():
+    # Lots whose counter no longer matches their spots.
+    return db.session.execute(
+        select(LotAvailability.lot_id).where(or_(
+            LotAvailability.available != _free_spots(LotAvailability.lot_id),
+            LotAvailability.first_free_spot_id.is_distinct_from(_first_free(LotAvailability.lot_id)),
+        ))
+    ).scalars().all()
+
+
+def spot_taken(lot_id, spot_id):
+    db.session.flush()
+    db.session.execute(
+        update(LotAvailability)
+        .where(LotAvailability.lot_id == lot_id)
+        .values(
+            available=LotAvailability.available - 1,
+            first_free_spot_id=case(
+                (LotAvailability.first_free_spot_id == spot_id, _first_free(lot_id, after=spot_id)),
+                else_=LotAvailability.first_free_spot_id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def spot_freed(lot_id, spot_id):
+    db.session.flush()
+    db.session.execute(
+        update(LotAvailability)
+        .where(LotAvailability.lot_id == lot_id)
+        .values(
+            available=LotAvailability.available + 1,
+            first_free_spot_id=case(
+                (LotAvailability.first_free_spot_id.is_(None), spot_id),
+                (LotAvailability.first_free_spot_id > spot_id, spot_id),
+                else_=LotAvailability.first_free_spot_id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_availability():
+    free = case((Spot.status == False, Spot.id))
+
+    db.session.query(LotAvailability).delete()
+    db.session.execute(
+        insert(LotAvailability).from_select(
+            ['lot_id', 'available', 'first_free_spot_id'],
+            select(Lot.id, func.count(free), func.min(free))
+            .outerjoin(Spot, Spot.lot_id == Lot.id)
+            .group_by(Lot.id)
+        )
+    )
+    db.session.commit()
+
+
+def ensure_availability():
+    missing = (
+        db.session.query(Lot.id)
+        .outerjoin(LotAvailability, LotAvailability.lot_id == Lot.id)
+        .filter(LotAvailability.lot_id.is_(None))
+        .first()
+    )
+    if missing:
+        rebuild_availability()
@@ -0,0 +1,61 @@
+import numpy as np
+from flask import current_app
+from sqlalchemy import update
+from models import db, Reserve
+
+BACKFILL_BATCH = 5000
+
+
+def tariff():
+    config = current_app.config
+    return {
+        'minimum_charge': config.get('BILLING_MINIMUM_CHARGE', 0.0),
+        'round_up_hours': config.get('BILLING_ROUND_UP_HOURS', False),
+        'daily_cap': config.get('BILLING_DAILY_CAP'),
+    }
+
+
+def compute_costs(start_times, end_times, rates, minimum_charge=0.0, round_up_hours=False, daily_cap=None):
+    # Costs for a whole batch of stays at once. Hours are pro-rata unless
+    # round_up_hours bills every started hour; daily_cap limits the charge for
+    # each 24 hour block of a stay; minimum_charge is the floor for any stay.
+    start = np.asarray(start_times, dtype='datetime64[us]')
+    end = np.asarray(end_times, dtype='datetime64[us]')
+    rates = np.asarray(rates, dtype=float)
+
+    hours = np.maximum((end - start) / np.timedelta64(1, 'h'), 0)
+    if round_up_hours:
+        hours = np.ceil(hours)
+
+    if daily_cap is None:
+        costs = hours * rates
+    else:
+        days = np.floor(hours / 24)
+        costs = days * np.minimum(24 * rates, daily_cap) + np.minimum((hours - days * 24) * rates, daily_cap)
+
+    return np.round(np.maximum(costs, minimum_charge), 2)
+
+
+def cost_of(reservation, end_time):
+    return float(compute_costs([reservation.start_time], [end_time], [reservation.cost_per_hour], **tariff())[0])
+
+
+def backfill_total_costs():
+    # Price closed reservations that predate the stored total_cost column, a batch at a time.
+    while True:
+        rows = (
+            db.session.query(Reserve.id, Reserve.start_time, Reserve.end_time, Reserve.cost_per_hour)
+            .filter(Reserve.end_time.isnot(None), Reserve.total_cost.is_(None))
+            .limit(BACKFILL_BATCH)
+            .all()
+        )
+        if not rows:
+            return
+
+        ids, starts, ends, rates = zip(*rows)
+        costs = compute_costs(starts, ends, rates, **tariff())
+        db.session.execute(
+            update(Reserve),
+            [{'id': reservation_id, 'total_cost': float(cost)} for reservation_id, cost in zip(ids, costs)],
+        )
+        db.session.commit()
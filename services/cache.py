@@ -0,0 +1,235 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from importlib import import_module
+from flask import current_app
+
+
+class CacheBackend:
+    # Interface for lot catalog caches. A shared implementation (Redis,
+    # memcached, ...) can be plugged in with the CACHE_BACKEND setting so every
+    # worker sees the same entries and the same invalidations. Values are never None.
+
+    def get_many(self, keys):
+        raise NotImplementedError
+
+    def set_many(self, mapping):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    # Stamps are small values that are never evicted and never expire.
+
+    def get_stamp(self, key):
+        raise NotImplementedError
+
+    def set_stamp(self, key, value):
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    # In-process LRU with a per-entry TTL. Only safe as the sole cache when the
+    # app runs in a single process.
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.stamps = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_many(self, keys):
+        found = {}
+        now = time.monotonic()
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self.entries[key]
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = entry[1]
+                self.hits += 1
+        return found
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            for key, value in mapping.items():
+                self.entries[key] = (expires, value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self.entries)}
+
+    def get_stamp(self, key):
+        return self.stamps.get(key)
+
+    def set_stamp(self, key, value):
+        with self.lock:
+            self.stamps[key] = value
+
+
+class SQLiteCache(CacheBackend):
+    # Cache shared by every process on one host, kept in its own SQLite file
+    # (never the application database). Invalidations are visible to all
+    # workers as soon as delete_many returns. Hit/miss counters are per process.
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, max_entries=10000, ttl=300, path=None):
+        if not path:
+            raise ValueError("SQLiteCache needs a path (CACHE_PATH)")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self.connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires ON cache (expires)")
+        conn.execute("CREATE TABLE IF NOT EXISTS stamp (key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID")
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self.local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        rows = self.connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(keys))}) AND expires >= ?", (*keys, now)
+        ).fetchall()
+        found = {key: pickle.loads(value) for key, value in rows}
+        with self.lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, mapping):
+        expires = time.time() + self.ttl
+        conn = self.connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+            [(key, expires, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in mapping.items()],
+        )
+        with self.lock:
+            self.writes += len(mapping)
+            prune = self.writes >= self.PRUNE_EVERY
+            if prune:
+                self.writes = 0
+        if prune:
+            self.prune(conn)
+
+    def prune(self, conn):
+        conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)", (excess,))
+            with self.lock:
+                self.evictions += excess
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            self.connection().execute(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self.connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        entries = self.connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': entries}
+
+    def get_stamp(self, key):
+        row = self.connection().execute("SELECT value FROM stamp WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set_stamp(self, key, value):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO stamp (key, value) VALUES (?, ?)", (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        )
+
+
+def make_cache(backend, max_entries, ttl, options):
+    module_name, class_name = backend.rsplit('.', 1)
+    backend_class = getattr(import_module(module_name), class_name)
+    return backend_class(max_entries=max_entries, ttl=ttl, **options)
+
+
+def init_cache(app):
+    backend = app.config.get('CACHE_BACKEND', 'services.cache.LocalCache')
+    app.extensions['cache'] = make_cache(
+        backend, app.config.get('CACHE_MAX_ENTRIES', 10000), app.config.get('CACHE_TTL', 300),
+        app.config.get('CACHE_OPTIONS', {}),
+    )
+    # Rendered pages get their own instance and size limit, so they can never
+    # evict the catalog and principal entries above.
+    app.extensions['page_cache'] = make_cache(
+        backend, app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1000), app.config.get('RESPONSE_CACHE_SECONDS') or 60,
+        app.config.get('RESPONSE_CACHE_OPTIONS', {}),
+    )
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def get_page_cache():
+    return current_app.extensions['page_cache']
+
+
+DATA_VERSION_KEY = 'data:version'
+
+
+def data_version():
+    # Opaque stamp that changes whenever a write invalidates cached data; page
+    # caches key on it. Kept as a stamp so it is never evicted.
+    cache = get_cache()
+    version = cache.get_stamp(DATA_VERSION_KEY)
+    if version is None:
+        version = bump_data_version()
+    return version
+
+
+def bump_data_version():
+    version = os.urandom(8).hex()
+    get_cache().set_stamp(DATA_VERSION_KEY, version)
+    return version
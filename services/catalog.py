@@ -0,0 +1,86 @@
+from models import db, Lot, LotAvailability
+from services.cache import bump_data_version, get_cache
+from services.dashboard import lot_overview
+from services.metrics import allow_queries
+
+ACTIVE_LOTS_KEY = 'lots:active'
+
+
+def read_through(prefix, ids, load):
+    # Fetch `prefix:<id>` entries, loading every miss with a single call to load(missing_ids).
+    # That one load is not charged to the request's query budget, which assumes
+    # a warm catalog; a loader issuing more than one query still trips it.
+    cache = get_cache()
+    keys = {lot_id: f"{prefix}:{lot_id}" for lot_id in ids}
+    cached = cache.get_many(keys.values())
+    found = {lot_id: cached[key] for lot_id, key in keys.items() if key in cached}
+
+    missing = [lot_id for lot_id in ids if lot_id not in found]
+    if missing:
+        allow_queries(1)
+        loaded = load(missing)
+        cache.set_many({keys[lot_id]: value for lot_id, value in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+def load_lots(ids):
+    return {
+        lot.id: {
+            "id": lot.id,
+            "name": lot.name,
+            "address": lot.address,
+            "pincode": lot.pincode,
+            "price_per_hour": lot.price_per_hour,
+            "total_spots": lot.total_spots,
+            "is_active": lot.is_active,
+        }
+        for lot in Lot.query.filter(Lot.id.in_(ids))
+    }
+
+
+def load_availability(ids):
+    found = {
+        row.lot_id: {"available": row.available, "first_free_spot_id": row.first_free_spot_id}
+        for row in LotAvailability.query.filter(LotAvailability.lot_id.in_(ids))
+    }
+    return {lot_id: found.get(lot_id, {"available": 0, "first_free_spot_id": None}) for lot_id in ids}
+
+
+def load_occupancy(ids):
+    return {lot["id"]: {"occupied": lot["occupied"], "bitmap": lot["bitmap"]} for lot in lot_overview(ids)}
+
+
+def active_lot_ids():
+    cache = get_cache()
+    ids = cache.get_many([ACTIVE_LOTS_KEY]).get(ACTIVE_LOTS_KEY)
+    if ids is None:
+        allow_queries(1)
+        ids = [lot_id for (lot_id,) in db.session.query(Lot.id).filter(Lot.is_active == True).order_by(Lot.id)]
+        cache.set_many({ACTIVE_LOTS_KEY: ids})
+    return ids
+
+
+def lots_by_id(ids):
+    return read_through("lot", ids, load_lots)
+
+
+def availability_by_id(ids):
+    return read_through("availability", ids, load_availability)
+
+
+def occupancy_by_id(ids):
+    return read_through("occupancy", ids, load_occupancy)
+
+
+# Invalidation is driven by the write paths and must run after their commit,
+# so a concurrent reader cannot re-cache the pre-commit state.
+
+def invalidate_lot(lot_id):
+    get_cache().delete_many([ACTIVE_LOTS_KEY, f"lot:{lot_id}", f"availability:{lot_id}", f"occupancy:{lot_id}"])
+    bump_data_version()
+
+
+def invalidate_availability(lot_id):
+    get_cache().delete_many([f"availability:{lot_id}", f"occupancy:{lot_id}"])
+    bump_data_version()
@@ -0,0 +1,67 @@
+from sqlalchemy import case, func, select
+from models import db, Lot, Spot
+
+
+def pack_bitmap(total, positions):
+    # Bit i (LSB-first within each byte) is set when the lot's (i + 1)-th spot is occupied.
+    bits = bytearray((total + 7) // 8)
+    for position in positions:
+        bits[(position - 1) // 8] |= 1 << ((position - 1) % 8)
+    return bits.hex()
+
+
+def lot_overview(lot_ids=None):
+    # Counts and an occupancy bitmap for every active lot (or just `lot_ids`) in
+    # one round trip. Spots are numbered by id within their lot, and only
+    # occupied positions leave the database.
+    lots = [Lot.is_active == True]
+    if lot_ids is not None:
+        lots.append(Lot.id.in_(lot_ids))
+
+    ranked = (
+        select(
+            Spot.lot_id,
+            Spot.status,
+            func.row_number().over(partition_by=Spot.lot_id, order_by=Spot.id).label('position'),
+        )
+        .join(Lot, Lot.id == Spot.lot_id)
+        .where(*lots)
+        .subquery()
+    )
+    occupancy = (
+        select(
+            ranked.c.lot_id,
+            func.count().label('spots'),
+            func.count(case((ranked.c.status == True, 1))).label('occupied'),
+            func.group_concat(case((ranked.c.status == True, ranked.c.position))).label('positions'),
+        )
+        .group_by(ranked.c.lot_id)
+        .subquery()
+    )
+
+    rows = (
+        db.session.query(Lot.id, Lot.name, Lot.total_spots, occupancy.c.spots, occupancy.c.occupied, occupancy.c.positions)
+        .outerjoin(occupancy, occupancy.c.lot_id == Lot.id)
+        .filter(*lots)
+        .order_by(Lot.id)
+        .all()
+    )
+
+    lots = []
+    for lot_id, name, total_spots, spots, occupied, positions in rows:
+        positions = [int(p) for p in positions.split(",")] if positions else []
+        lots.append({
+            "id": lot_id,
+            "name": name,
+            "total_spots": total_spots,
+            "occupied": occupied or 0,
+            "bitmap": pack_bitmap(spots or 0, positions),
+        })
+    return lots
+
+
+def lot_spots(lot_id):
+    return [
+        [spot_id, bool(status)]
+        for spot_id, status in db.session.query(Spot.id, Spot.status).filter(Spot.lot_id == lot_id).order_by(Spot.id)
+    ]
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+from sqlalchemy import literal_column, select
+from models import db, Lot, LotDailyRevenue
+from services.archive import lot_of, reservation_history
+
+EXPORT_BATCH = 1000
+
+RESERVATION_COLUMNS = [
+    'reservation_id', 'user_id', 'vehicle_number', 'lot_id', 'lot_name', 'spot_id', 'spot_number',
+    'start_time', 'end_time', 'cost_per_hour', 'hours', 'cost',
+]
+REVENUE_COLUMNS = ['lot_id', 'lot_name', 'day', 'reservations', 'hours', 'revenue']
+
+
+def reservation_statement(lot_id=None, user_id=None, start=None, end=None):
+    def criteria(model):
+        filters = []
+        if lot_id is not None:
+            filters.append(lot_of(model) == lot_id)
+        if user_id is not None:
+            filters.append(model.user_id == user_id)
+        if start:
+            filters.append(model.start_time >= datetime.combine(start, time.min))
+        if end:
+            filters.append(model.start_time < datetime.combine(end + timedelta(days=1), time.min))
+        return filters
+
+    history = reservation_history(
+        ["id", "user_id", "vehicle_number", "lot_id", "location", "spot_id", "spot_number",
+         "start_time", "end_time", "cost_per_hour", "total_cost"],
+        criteria,
+    )
+    return history.order_by(literal_column("id"))
+
+
+def revenue_statement(lot_id=None, start=None, end=None):
+    statement = (
+        select(
+            LotDailyRevenue.lot_id, Lot.name, LotDailyRevenue.day, LotDailyRevenue.reservations,
+            LotDailyRevenue.hours, LotDailyRevenue.revenue,
+        )
+        .join(Lot, Lot.id == LotDailyRevenue.lot_id)
+        .order_by(LotDailyRevenue.day, LotDailyRevenue.lot_id)
+    )
+    if lot_id is not None:
+        statement = statement.where(LotDailyRevenue.lot_id == lot_id)
+    if start:
+        statement = statement.where(LotDailyRevenue.day >= start)
+    if end:
+        statement = statement.where(LotDailyRevenue.day <= end)
+    return statement
+
+
+def reservation_record(row):
+    reservation_id, user_id, vehicle_number, lot_id, lot_name, spot_id, spot_number, start_time, end_time, rate, cost = row
+    hours = None
+    if end_time:
+        hours = round(max((end_time - start_time).total_seconds() / 3600, 0), 4)
+    return [
+        reservation_id, user_id, vehicle_number, lot_id, lot_name, spot_id, spot_number,
+        start_time.isoformat(), end_time.isoformat() if end_time else None, rate, hours, cost,
+    ]
+
+
+def revenue_record(row):
+    lot_id, lot_name, day, reservations, hours, revenue = row
+    return [lot_id, lot_name, day.isoformat() if hasattr(day, 'isoformat') else day, reservations, round(hours, 4), round(revenue, 2)]
+
+
+def stream_rows(statement):
+    # Server-side cursor: rows arrive in EXPORT_BATCH chunks, never all at once.
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def stream_csv(statement, columns, to_record):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for partition in stream_rows(statement):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(to_record(row) for row in partition)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(statement, columns, to_record):
+    for partition in stream_rows(statement):
+        yield "".join(json.dumps(dict(zip(columns, to_record(row)))) + "\n" for row in partition)
@@ -0,0 +1,317 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_STATEMENTS = 10
+# cache="<label>" on /metrics -> app.extensions key
+CACHES = (('catalog', 'cache'), ('pages', 'page_cache'))
+
+# Upper bound on SQL statements per request, by endpoint, assuming a cached
+# principal and a warm lot catalog (see allow_queries). Enforced when ENFORCE_QUERY_BUDGETS is set so
+# N+1 regressions fail loudly in tests.
+DEFAULT_QUERY_BUDGETS = {
+    'auth.login': 3,
+    'auth.register': 2,
+    'auth.admin_dashboard': 4,
+    'auth.admin_lot_spots': 1,
+    'auth.edit_profile': 3,
+    'auth.add_lot': 8,
+    'auth.edit_lot': 10,
+    'auth.delete_lot': 3,
+    'auth.view_spot': 2,
+    'auth.view_occupied_spot': 2,
+    'auth.delete_spot': 8,
+    'auth.admin_users': 1,
+    'auth.user_parking_history': 2,
+    'auth.admin_search': 3,
+    'auth.admin_summary': 2,
+    'auth.admin_occupancy': 3,
+    'auth.user_dashboard': 4,
+    'auth.book_spot': 8,
+    'auth.user_reservations': 1,
+    'auth.release_spot': 7,
+    'auth.user_summary': 1,
+    'api_v1.login': 3,
+    'api_v1.lots': 4,
+    'api_v1.book_spot': 7,
+    'api_v1.release_spot': 7,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.slowest = []
+
+    def observe_request(self, endpoint, seconds, queries, sql_seconds):
+        with self.lock:
+            stats = self.requests.get(endpoint)
+            if stats is None:
+                stats = self.requests[endpoint] = {
+                    'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0, 'queries': 0, 'sql_seconds': 0.0,
+                }
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['buckets'][i] += 1
+            stats['count'] += 1
+            stats['sum'] += seconds
+            stats['queries'] += queries
+            stats['sql_seconds'] += sql_seconds
+
+    def observe_statement(self, statement, seconds):
+        with self.lock:
+            if len(self.slowest) < SLOW_STATEMENTS:
+                heapq.heappush(self.slowest, (seconds, statement))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': {endpoint: dict(stats, buckets=list(stats['buckets'])) for endpoint, stats in self.requests.items()},
+                'slowest': [list(entry) for entry in self.slowest],
+            }
+
+    def render(self, others=()):
+        # This process's numbers, added to the snapshots other workers published.
+        requests, slowest = merge_snapshots([self.snapshot(), *others])
+        lines = [
+            "# HELP parking_request_duration_seconds Request latency by endpoint.",
+            "# TYPE parking_request_duration_seconds histogram",
+        ]
+        for endpoint, stats in sorted(requests.items()):
+            label = f'endpoint="{escape(endpoint)}"'
+            for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+                lines.append(f'parking_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'parking_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+            lines.append(f'parking_request_duration_seconds_sum{{{label}}} {stats["sum"]:.6f}')
+            lines.append(f'parking_request_duration_seconds_count{{{label}}} {stats["count"]}')
+
+        lines += ["# HELP parking_request_queries_total SQL statements issued, by endpoint.",
+                  "# TYPE parking_request_queries_total counter"]
+        lines += [f'parking_request_queries_total{{endpoint="{escape(e)}"}} {s["queries"]}' for e, s in sorted(requests.items())]
+
+        lines += ["# HELP parking_request_sql_seconds_total Time spent in SQL, by endpoint.",
+                  "# TYPE parking_request_sql_seconds_total counter"]
+        lines += [f'parking_request_sql_seconds_total{{endpoint="{escape(e)}"}} {s["sql_seconds"]:.6f}' for e, s in sorted(requests.items())]
+
+        lines += ["# HELP parking_slow_statement_seconds Slowest SQL statements seen since startup.",
+                  "# TYPE parking_slow_statement_seconds gauge"]
+        lines += [
+            f'parking_slow_statement_seconds{{rank="{rank}",statement="{escape(statement)}"}} {seconds:.6f}'
+            for rank, (seconds, statement) in enumerate(slowest, start=1)
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def merge_snapshots(snapshots):
+    requests = {}
+    slowest = {}
+    for snapshot in snapshots:
+        for endpoint, stats in snapshot['requests'].items():
+            total = requests.get(endpoint)
+            if total is None:
+                requests[endpoint] = dict(stats, buckets=list(stats['buckets']))
+                continue
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+            for name in ('count', 'sum', 'queries', 'sql_seconds'):
+                total[name] += stats[name]
+        # Workers forked from the same master share its startup statements.
+        for seconds, statement in snapshot['slowest']:
+            slowest[statement] = max(seconds, slowest.get(statement, 0.0))
+    ranked = heapq.nlargest(SLOW_STATEMENTS, ((seconds, statement) for statement, seconds in slowest.items()))
+    return requests, ranked
+
+
+class MetricsStore:
+    # Every worker's latest snapshot, one row per process, in a SQLite file
+    # shared by the processes on a host (never the application database), so
+    # whichever worker answers /metrics reports the whole server. Rows of
+    # exited workers are kept so counters never go backwards; gunicorn's
+    # master removes the file at startup.
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS snapshot (worker TEXT PRIMARY KEY, updated REAL NOT NULL, value TEXT NOT NULL)"
+        )
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self.local.conn = conn
+        return conn
+
+    def publish(self, worker, snapshot):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO snapshot (worker, updated, value) VALUES (?, ?, ?)",
+            (worker, time.time(), json.dumps(snapshot)),
+        )
+
+    def snapshots(self, exclude=None):
+        rows = self.connection().execute("SELECT worker, value FROM snapshot").fetchall()
+        return [json.loads(value) for worker, value in rows if worker != exclude]
+
+
+def escape(value):
+    value = " ".join(value.split())[:200]
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+metrics = Metrics()
+_worker = None
+
+
+def worker_id():
+    # Keyed by pid and first use, so a recycled pid never overwrites the
+    # counters of the worker that had it before. Computed lazily because
+    # workers are forked after this module is imported by the master.
+    global _worker
+    if _worker is None or _worker[0] != os.getpid():
+        _worker = (os.getpid(), f"{os.getpid()}:{time.time():.6f}")
+    return _worker[1]
+
+
+def cache_stats(app):
+    # The lot catalog and rendered pages are separate cache instances.
+    return {label: app.extensions[name].stats() for label, name in CACHES if name in app.extensions}
+
+
+def process_snapshot(app):
+    return dict(metrics.snapshot(), caches=cache_stats(app))
+
+
+def render_caches(snapshots):
+    # Hit, miss and eviction counters are kept per process and added up.
+    # Entries is the size as the first (answering) process sees it, which for
+    # the shared SQLiteCache is already the host's.
+    totals = {}
+    for index, snapshot in enumerate(snapshots):
+        for label, stats in snapshot.get('caches', {}).items():
+            total = totals.setdefault(label, dict.fromkeys(stats, 0))
+            for name, value in stats.items():
+                if name != 'entries':
+                    total[name] += value
+                elif index == 0:
+                    total[name] = value
+
+    lines = []
+    for name in ('hits', 'misses', 'evictions', 'entries'):
+        kind = "gauge" if name == "entries" else "counter"
+        metric = f"parking_cache_{name}" if kind == "gauge" else f"parking_cache_{name}_total"
+        lines.append(f"# TYPE {metric} {kind}")
+        lines += [f'{metric}{{cache="{label}"}} {stats[name]}' for label, stats in totals.items() if name in stats]
+    return "\n".join(lines) + "\n"
+
+
+def publish_metrics(app):
+    store = app.extensions.get('metrics_store')
+    if store is not None:
+        store.publish(worker_id(), process_snapshot(app))
+
+
+def render_metrics():
+    store = current_app.extensions.get('metrics_store')
+    others = store.snapshots(exclude=worker_id()) if store is not None else []
+    return metrics.render(others) + render_caches([process_snapshot(current_app), *others])
+
+
+def start_metrics_publisher(app):
+    # Each worker writes its snapshot to the shared store every
+    # METRICS_PUBLISH_SECONDS, and once more as it exits (see shutdown_app).
+    interval = app.config.get('METRICS_PUBLISH_SECONDS')
+    if 'metrics_store' not in app.extensions or not interval:
+        return None
+
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                publish_metrics(app)
+            except sqlite3.Error:
+                app.logger.exception("Publishing metrics failed")
+
+    thread = threading.Thread(target=loop, name="metrics-publisher", daemon=True)
+    thread.start()
+    app.extensions['metrics_publisher'] = stop
+    return thread
+
+
+def allow_queries(count):
+    # Per-request overhead outside the endpoint's own work, such as loading the
+    # signed-in user on a principal cache miss, is not charged to its budget.
+    # Statements executed with the contention_retry option (claim_spot after a
+    # lost race) are left out of the budget check without calling this.
+    if has_request_context() and 'request_started' in g:
+        g.query_allowance += count
+
+
+def init_metrics(app, engine):
+    budgets = dict(DEFAULT_QUERY_BUDGETS, **app.config.get('QUERY_BUDGETS', {}))
+    if app.config.get('METRICS_PATH'):
+        app.extensions['metrics_store'] = MetricsStore(app.config['METRICS_PATH'])
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        metrics.observe_statement(statement, seconds)
+        if has_request_context() and 'request_started' in g:
+            g.query_count += 1
+            g.sql_seconds += seconds
+            if context is not None and context.execution_options.get('contention_retry'):
+                g.query_retries += 1
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.query_allowance = 0
+        g.query_retries = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def end_request(response):
+        if 'request_started' not in g:
+            return response
+        seconds = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe_request(endpoint, seconds, g.query_count, g.sql_seconds)
+
+        if app.config.get('SERVER_TIMING'):
+            response.headers['Server-Timing'] = (
+                f'app;dur={seconds * 1000:.1f}, db;dur={g.sql_seconds * 1000:.1f};desc="{g.query_count} queries"'
+            )
+
+        budget = budgets.get(endpoint)
+        if budget is not None and g.query_count - g.query_retries > budget + g.query_allowance:
+            message = (f"{endpoint} issued {g.query_count} queries, {g.query_retries} of them contention retries "
+                       f"(budget {budget} + {g.query_allowance} allowed)")
+            if app.config.get('ENFORCE_QUERY_BUDGETS'):
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
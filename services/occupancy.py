@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, or_, select, update
+from models import db, Lot, Spot, Reserve, LotHourlyOccupancy, RollupWatermark
+
+WATERMARK = "lot_hourly_occupancy"
+HOUR = timedelta(hours=1)
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def spread_over_hours(start, end, lot_id, buckets):
+    # Add the spot-hours of [start, end) to each hour bucket they touch.
+    hour = floor_hour(start)
+    while hour < end:
+        next_hour = hour + HOUR
+        overlap = (min(end, next_hour) - max(start, hour)).total_seconds() / 3600
+        if overlap > 0:
+            buckets[(lot_id, hour)][0] += overlap
+        hour = next_hour
+
+
+def fold_window(window_start, window_end):
+    # Occupancy of every reservation overlapping [window_start, window_end);
+    # reservations still open count as occupied up to window_end.
+    rows = db.session.execute(
+        select(Spot.lot_id, Reserve.start_time, Reserve.end_time)
+        .join(Spot, Spot.id == Reserve.spot_id)
+        .where(
+            Reserve.start_time < window_end,
+            or_(Reserve.end_time.is_(None), Reserve.end_time > window_start),
+        )
+    ).all()
+
+    buckets = defaultdict(lambda: [0.0, 0])
+    for lot_id, start_time, end_time in rows:
+        start = max(start_time, window_start)
+        end = min(end_time or window_end, window_end)
+        spread_over_hours(start, end, lot_id, buckets)
+        if start_time >= window_start:
+            buckets[(lot_id, floor_hour(start_time))][1] += 1
+
+    if buckets:
+        db.session.execute(insert(LotHourlyOccupancy), [
+            {"lot_id": lot_id, "hour": hour, "occupied_hours": occupied, "arrivals": arrivals}
+            for (lot_id, hour), (occupied, arrivals) in buckets.items()
+        ])
+    return len(buckets)
+
+
+def fold_occupancy(chunk_hours=168, now=None):
+    # Fold every completed hour since the last run into lot_hourly_occupancy,
+    # chunk_hours per transaction. Each hour is written exactly once: the
+    # watermark only moves forward, and only if no other worker moved it first.
+    until = floor_hour(now or datetime.now())
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    if watermark is None:
+        first_start = db.session.query(func.min(Reserve.start_time)).scalar()
+        origin = floor_hour(first_start) if first_start else until
+        watermark = RollupWatermark(name=WATERMARK, started_at=origin, processed_until=origin)
+        db.session.add(watermark)
+        db.session.commit()
+
+    folded = 0
+    window_start = watermark.processed_until
+    while window_start < until:
+        window_end = min(window_start + timedelta(hours=chunk_hours), until)
+        claimed = db.session.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK, RollupWatermark.processed_until == window_start)
+            .values(processed_until=window_end)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            break
+        folded += fold_window(window_start, window_end)
+        db.session.commit()
+        window_start = window_end
+    db.session.expire(watermark)
+    return folded
+
+
+def occupancy_heatmap(weeks=4, lot_id=None):
+    # Hour-of-week utilisation per lot over the last `weeks` folded weeks:
+    # average occupied spot-hours per hour slot divided by the lot's spots.
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    if watermark is None:
+        return {"start": None, "end": None, "lots": []}
+    end = watermark.processed_until
+    start = max(end - timedelta(weeks=weeks), watermark.started_at)
+
+    # Hours with no occupancy have no bucket, so divide by how often each
+    # hour-of-week slot occurs in the range rather than by rows found.
+    occurrences = defaultdict(int)
+    hour = start
+    while hour < end:
+        occurrences[(int(hour.strftime('%w')), hour.hour)] += 1
+        hour += HOUR
+
+    day_of_week = func.cast(func.strftime('%w', LotHourlyOccupancy.hour), db.Integer)
+    hour_of_day = func.cast(func.strftime('%H', LotHourlyOccupancy.hour), db.Integer)
+    slots = (
+        select(
+            LotHourlyOccupancy.lot_id.label("lot_id"),
+            day_of_week.label("day"),
+            hour_of_day.label("hour_of_day"),
+            func.sum(LotHourlyOccupancy.occupied_hours).label("occupied"),
+            func.sum(LotHourlyOccupancy.arrivals).label("arrivals"),
+            # SQLite returns the bare column from the row that holds max().
+            func.max(LotHourlyOccupancy.occupied_hours).label("peak"),
+            LotHourlyOccupancy.hour.label("peak_hour"),
+        )
+        .where(LotHourlyOccupancy.hour >= start, LotHourlyOccupancy.hour < end)
+        .group_by(LotHourlyOccupancy.lot_id, day_of_week, hour_of_day)
+    )
+    if lot_id is not None:
+        slots = slots.where(LotHourlyOccupancy.lot_id == lot_id)
+    slots = slots.subquery()
+
+    rows = db.session.execute(
+        select(Lot.id, Lot.name, Lot.total_spots, slots.c.day, slots.c.hour_of_day,
+               slots.c.occupied, slots.c.arrivals, slots.c.peak, slots.c.peak_hour)
+        .join(slots, slots.c.lot_id == Lot.id)
+        .order_by(Lot.id)
+    ).all()
+
+    lots = {}
+    for lot_id, name, total_spots, day, hour_of_day, occupied, arrivals, peak, peak_hour in rows:
+        spots = max(total_spots, 1)
+        lot = lots.get(lot_id)
+        if lot is None:
+            lot = lots[lot_id] = {
+                "lot_id": lot_id,
+                "lot": name,
+                "total_spots": total_spots,
+                "utilization": [[0.0] * 24 for _ in range(7)],
+                "arrivals": [[0] * 24 for _ in range(7)],
+                "peak": {"utilization": 0.0, "hour": None},
+            }
+        lot["utilization"][day][hour_of_day] = round(occupied / occurrences[(day, hour_of_day)] / spots, 4)
+        lot["arrivals"][day][hour_of_day] = arrivals
+        if peak / spots > lot["peak"]["utilization"]:
+            lot["peak"] = {"utilization": round(peak / spots, 4), "hour": peak_hour.isoformat()}
+
+    return {"start": start.isoformat(), "end": end.isoformat(), "lots": list(lots.values())}
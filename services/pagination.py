@@ -0,0 +1,55 @@
+from datetime import datetime
+from sqlalchemy import and_, literal_column, or_
+from models import db, User
+from services.archive import reservation_history
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(reservation):
+    return f"{reservation.start_time.isoformat()}_{reservation.id}"
+
+
+def decode_cursor(cursor):
+    try:
+        start_time, reservation_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(start_time), int(reservation_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def reservation_page(user_id, cursor=None, limit=PAGE_SIZE):
+    # One bounded query per page: keyset on (start_time, id), newest first,
+    # merged from the (user_id, start_time) indexes of the live and archived
+    # reservations with the lot joined in.
+    position = decode_cursor(cursor)
+
+    def criteria(model):
+        filters = [model.user_id == user_id]
+        if position:
+            start_time, reservation_id = position
+            filters.append(or_(
+                model.start_time < start_time,
+                and_(model.start_time == start_time, model.id < reservation_id),
+            ))
+        return filters
+
+    history = reservation_history(
+        ["id", "location", "address", "pincode", "vehicle_number", "start_time", "end_time", "cost_per_hour", "total_cost"],
+        criteria,
+    )
+    rows = db.session.execute(
+        history.order_by(literal_column("start_time").desc(), literal_column("id").desc()).limit(limit + 1)
+    ).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def user_page(after_id=None, limit=PAGE_SIZE):
+    query = User.query.filter(User.id != 0)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    rows = query.order_by(User.id).limit(limit + 1).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_after
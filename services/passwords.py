@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import update
+from werkzeug.security import check_password_hash, generate_password_hash
+from models import db, User
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Runs the deliberately slow KDF on a small dedicated pool so a login surge
+    # can only ever occupy `workers` cores; everything else keeps serving.
+    # With workers=0 hashing happens inline on the request thread.
+
+    def __init__(self, method, workers, queue_size, wait):
+        self.method = method
+        # werkzeug expands shorthand methods ("scrypt" -> "scrypt:32768:8:1"),
+        # so compare stored hashes against the prefix it actually writes.
+        self.prefix = generate_password_hash("", method).split("$", 1)[0]
+        self.wait = wait
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hasher") if workers else None
+        self.slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+
+    def run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        if not self.slots.acquire(timeout=self.wait):
+            raise HasherBusy()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        # Returns (matches, needs_rehash).
+        matches = self.run(check_password_hash, stored_hash, password)
+        return matches, matches and stored_hash.split("$", 1)[0] != self.prefix
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def init_passwords(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE'],
+        wait=app.config['PASSWORD_HASH_WAIT'],
+    )
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(stored_hash, password):
+    return get_hasher().verify(stored_hash, password)
+
+
+def rehash_password(user_id, stored_hash, new_hash):
+    # Upgrade a hash verified outside any transaction; a password changed in
+    # the meantime wins over the upgrade.
+    db.session.execute(
+        update(User).where(User.id == user_id, User.password == stored_hash).values(password=new_hash)
+    )
+    db.session.commit()
@@ -0,0 +1,69 @@
+from collections import namedtuple
+from functools import wraps
+from flask import abort, flash, g, jsonify, redirect, session, url_for
+from models import db, User
+from services.cache import bump_data_version, get_cache
+from services.metrics import allow_queries
+
+Principal = namedtuple('Principal', ['id', 'name', 'email', 'is_admin'])
+
+
+def principal_key(user_id):
+    return f"principal:{user_id}"
+
+
+def load_principal():
+    # Resolve the signed-in user once per request, from the shared cache when possible.
+    g.principal = None
+    user_id = session.get('user_id')
+    if user_id is None:
+        return
+
+    cache = get_cache()
+    key = principal_key(user_id)
+    principal = cache.get_many([key]).get(key)
+    if principal is None:
+        allow_queries(1)
+        row = db.session.query(User.id, User.name, User.email, User.is_admin).filter(User.id == user_id).first()
+        if row is None:
+            session.clear()
+            return
+        principal = Principal(*row)
+        cache.set_many({key: principal})
+    g.principal = principal
+
+
+def invalidate_principal(user_id):
+    get_cache().delete_many([principal_key(user_id)])
+    bump_data_version()
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.principal is None:
+            flash("Please log in to continue.")
+            return redirect(url_for('auth.login'))
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.principal is None:
+            flash("Please log in to continue.")
+            return redirect(url_for('auth.login'))
+        if not g.principal.is_admin:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.principal is None:
+            return jsonify({"error": "unauthenticated"}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,45 @@
+from sqlalchemy import String, cast, delete, false, func, insert, literal, or_, select
+from models import db, Spot
+
+
+def add_spots(lot_id, first_number, last_number):
+    # Insert spots numbered first_number..last_number in one INSERT ... SELECT,
+    # generating the numbering with a recursive CTE instead of a Python loop.
+    if last_number < first_number:
+        return
+
+    seq = select(literal(first_number).label('n')).cte('seq', recursive=True)
+    seq = seq.union_all(select(seq.c.n + 1).where(seq.c.n < last_number))
+
+    db.session.execute(
+        insert(Spot).from_select(
+            ['lot_id', 'spot_number', 'status', 'was_occupied'],
+            select(
+                literal(lot_id),
+                literal("Spot ").concat(cast(seq.c.n, String)),
+                false(),
+                false(),
+            )
+        )
+    )
+
+
+def remove_spots(lot_id, count):
+    # Delete the lot's last `count` spots in one statement. Returns False without
+    # deleting anything if any of them is occupied or has been used before.
+    tail = (
+        select(Spot.id)
+        .where(Spot.lot_id == lot_id)
+        .order_by(Spot.id.desc())
+        .limit(count)
+        .scalar_subquery()
+    )
+
+    used = db.session.execute(
+        select(func.count(Spot.id)).where(Spot.id.in_(tail), or_(Spot.was_occupied == True, Spot.status == True))
+    ).scalar()
+    if used:
+        return False
+
+    db.session.execute(delete(Spot).where(Spot.id.in_(tail)).execution_options(synchronize_session=False))
+    return True
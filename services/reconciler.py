@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import exists, select, update
+from models import db, Spot, Reserve
+from services.archive import archive_reservations
+from services.availability import drifted_lots, refresh_lot
+from services.catalog import invalidate_availability
+from services.occupancy import fold_occupancy
+from services.reservations import AlreadyReleased, close_reservation
+
+
+def open_reservation(spot_id_column):
+    return exists().where(Reserve.spot_id == spot_id_column, Reserve.end_time.is_(None))
+
+
+def reconcile_spots(batch, pause=0.0):
+    # Walk parkingspot in id windows of `batch`, each window its own short
+    # transaction, and make status agree with whether an open reservation
+    # exists. The UPDATEs re-check the condition so they never undo a booking
+    # or release that committed after the window was read.
+    fixed = 0
+    last_id = 0
+    while True:
+        window = db.session.execute(
+            select(Spot.id).where(Spot.id > last_id).order_by(Spot.id).limit(batch)
+        ).scalars().all()
+        if not window:
+            break
+        low, high = window[0], window[-1]
+        last_id = high
+        in_window = Spot.id.between(low, high)
+
+        stale = db.session.execute(
+            select(Spot.id, Spot.lot_id).where(in_window, Spot.status == True, ~open_reservation(Spot.id))
+        ).all()
+        missing = db.session.execute(
+            select(Spot.id, Spot.lot_id).where(in_window, Spot.status == False, open_reservation(Spot.id))
+        ).all()
+        if not stale and not missing:
+            continue
+
+        if stale:
+            db.session.execute(
+                update(Spot)
+                .where(Spot.id.in_([spot_id for spot_id, _ in stale]), Spot.status == True, ~open_reservation(Spot.id))
+                .values(status=False)
+                .execution_options(synchronize_session=False)
+            )
+        if missing:
+            db.session.execute(
+                update(Spot)
+                .where(Spot.id.in_([spot_id for spot_id, _ in missing]), Spot.status == False, open_reservation(Spot.id))
+                .values(status=True, was_occupied=True)
+                .execution_options(synchronize_session=False)
+            )
+        lot_ids = {lot_id for _, lot_id in stale + missing}
+        for lot_id in lot_ids:
+            refresh_lot(lot_id)
+        db.session.commit()
+        for lot_id in lot_ids:
+            invalidate_availability(lot_id)
+
+        fixed += len(stale) + len(missing)
+        if pause:
+            time.sleep(pause)
+    return fixed
+
+
+def reconcile_availability():
+    # Spot statuses can be right while a lot's counter is not (a writer that
+    # died between statements, a hand edit); recompute every drifted lot.
+    lot_ids = drifted_lots()
+    if not lot_ids:
+        return 0
+    for lot_id in lot_ids:
+        refresh_lot(lot_id)
+    db.session.commit()
+    for lot_id in lot_ids:
+        invalidate_availability(lot_id)
+    return len(lot_ids)
+
+
+def expire_reservations(max_hours, action, batch, pause=0.0):
+    # Close ("close") or mark ("flag") open reservations older than max_hours,
+    # `batch` reservations per transaction.
+    cutoff = datetime.now() - timedelta(hours=max_hours)
+    handled = 0
+    while True:
+        query = Reserve.query.filter(Reserve.end_time.is_(None), Reserve.start_time < cutoff)
+        if action == "flag":
+            query = query.filter(Reserve.flagged_at.is_(None))
+        overdue = query.order_by(Reserve.id).limit(batch).all()
+        if not overdue:
+            break
+
+        now = datetime.now()
+        lot_ids = set()
+        for reservation in overdue:
+            if action == "close":
+                try:
+                    lot_ids.add(close_reservation(reservation, now))
+                except AlreadyReleased:
+                    # The driver released it between our read and this close.
+                    continue
+            else:
+                reservation.flagged_at = now
+        db.session.commit()
+        for lot_id in lot_ids - {None}:
+            invalidate_availability(lot_id)
+
+        handled += len(overdue)
+        if pause:
+            time.sleep(pause)
+    return handled
+
+
+def run_reconciliation(app):
+    config = app.config
+    pause = config['RECONCILE_PAUSE_MS'] / 1000
+    with app.app_context():
+        try:
+            result = {"spots": reconcile_spots(config['RECONCILE_BATCH'], pause), "reservations": 0}
+            if config['RESERVATION_MAX_HOURS']:
+                result["reservations"] = expire_reservations(
+                    config['RESERVATION_MAX_HOURS'], config['RESERVATION_EXPIRY_ACTION'], config['RECONCILE_BATCH'], pause
+                )
+            result["counters"] = reconcile_availability()
+            result["occupancy_buckets"] = fold_occupancy()
+            if config['ARCHIVE_AFTER_DAYS']:
+                result["archived"] = archive_reservations(config['ARCHIVE_AFTER_DAYS'], config['RECONCILE_BATCH'], pause)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Reconciliation run failed")
+            return None
+        finally:
+            db.session.remove()
+    if result["spots"] or result["reservations"] or result["counters"]:
+        app.logger.warning("Reconciled %d spots and %d lot counters, %s %d overdue reservations",
+                           result["spots"], result["counters"],
+                           "closed" if config['RESERVATION_EXPIRY_ACTION'] == "close" else "flagged",
+                           result["reservations"])
+    return result
+
+
+def acquire_leader_lock(path):
+    # Only one process per host reconciles: whoever holds an exclusive flock on
+    # `path`. The lock is released by the OS when that process exits, so another
+    # worker takes over on its next tick. Without fcntl (Windows) every process leads.
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    handle = open(path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def start_reconciler(app):
+    # In-process scheduler: a daemon thread that, every RECONCILE_INTERVAL
+    # seconds, runs a reconciliation pass if this process holds the leader lock.
+    interval = app.config['RECONCILE_INTERVAL']
+    if not interval or app.config.get('TESTING'):
+        return None
+
+    os.makedirs(os.path.dirname(app.config['RECONCILE_LOCK_FILE']), exist_ok=True)
+    stop = threading.Event()
+
+    def loop():
+        leader = None
+        while not stop.wait(interval):
+            if leader is None:
+                leader = acquire_leader_lock(app.config['RECONCILE_LOCK_FILE'])
+            if leader is not None:
+                run_reconciliation(app)
+
+    thread = threading.Thread(target=loop, name="reconciler", daemon=True)
+    thread.start()
+    app.extensions['reconciler'] = stop
+    return thread
@@ -0,0 +1,123 @@
+from datetime import datetime
+from sqlalchemy import func, case, insert, select, update
+from models import db, Lot, Spot, Reserve, ReserveArchive, LotDailyRevenue
+from services.archive import reservation_history
+
+
+def reservation_hours(reservation):
+    return max((reservation.end_time - reservation.start_time).total_seconds() / 3600, 0)
+
+
+def record_release(reservation, lot_id):
+    # Fold a freshly closed reservation into its lot's daily rollup, inside the caller's
+    # transaction. Call it only once the guarded close has changed the row, or a
+    # reservation released twice is counted twice.
+    hours = reservation_hours(reservation)
+    revenue = reservation.total_cost
+    day = reservation.end_time.date()
+
+    updated = db.session.execute(
+        update(LotDailyRevenue)
+        .where(LotDailyRevenue.lot_id == lot_id, LotDailyRevenue.day == day)
+        .values(
+            revenue=LotDailyRevenue.revenue + revenue,
+            hours=LotDailyRevenue.hours + hours,
+            reservations=LotDailyRevenue.reservations + 1,
+        )
+    ).rowcount
+
+    if not updated:
+        db.session.add(LotDailyRevenue(lot_id=lot_id, day=day, revenue=revenue, hours=hours, reservations=1))
+
+
+def rebuild_daily_rollups():
+    closed = reservation_history(
+        ["lot_id", "start_time", "end_time", "total_cost"], lambda model: [model.end_time.isnot(None)]
+    ).subquery()
+    hours = func.max((func.julianday(closed.c.end_time) - func.julianday(closed.c.start_time)) * 24.0, 0)
+    day = func.date(closed.c.end_time)
+
+    db.session.query(LotDailyRevenue).delete()
+    db.session.execute(
+        insert(LotDailyRevenue).from_select(
+            ['lot_id', 'day', 'revenue', 'hours', 'reservations'],
+            select(
+                closed.c.lot_id,
+                day,
+                func.sum(closed.c.total_cost),
+                func.sum(hours),
+                func.count(),
+            )
+            .group_by(closed.c.lot_id, day)
+        )
+    )
+    db.session.commit()
+
+
+def ensure_daily_rollups():
+    if db.session.query(LotDailyRevenue.lot_id).first():
+        return
+    if (db.session.query(Reserve.id).filter(Reserve.end_time.isnot(None)).first()
+            or db.session.query(ReserveArchive.id).first()):
+        rebuild_daily_rollups()
+
+
+def parse_day(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def revenue_by_lot(start=None, end=None):
+    revenue = func.sum(LotDailyRevenue.revenue)
+    query = (
+        db.session.query(Lot.name, revenue)
+        .join(LotDailyRevenue, LotDailyRevenue.lot_id == Lot.id)
+        .group_by(Lot.id, Lot.name)
+        .having(revenue > 0)
+        .order_by(Lot.id)
+    )
+    if start:
+        query = query.filter(LotDailyRevenue.day >= start)
+    if end:
+        query = query.filter(LotDailyRevenue.day <= end)
+
+    return [{'lot': name, 'revenue': round(total, 2)} for name, total in query.all()]
+
+
+def occupancy_by_lot():
+    rows = (
+        db.session.query(
+            Lot.name,
+            func.count(Spot.id),
+            func.sum(case((Spot.status == True, 1), else_=0)),
+        )
+        .outerjoin(Spot, Spot.lot_id == Lot.id)
+        .filter(Lot.is_active == True)
+        .group_by(Lot.id, Lot.name)
+        .order_by(Lot.id)
+        .all()
+    )
+    return [
+        {'lot': name, 'available': total - (occupied or 0), 'occupied': occupied or 0}
+        for name, total, occupied in rows
+    ]
+
+
+def spend_by_lot(user_id):
+    # One pass over the user's live and archived reservations for both charts.
+    history = reservation_history(
+        ["lot_id", "location", "start_time", "end_time", "total_cost"], lambda model: [model.user_id == user_id]
+    ).subquery()
+    hours = (func.julianday(history.c.end_time) - func.julianday(history.c.start_time)) * 24.0
+    rows = db.session.execute(
+        select(history.c.location, func.sum(history.c.total_cost), func.sum(hours))
+        .group_by(history.c.lot_id, history.c.location)
+        .order_by(history.c.lot_id)
+    ).all()
+    spent = [{'lot': name, 'spent': round(total, 2) if total else 0} for name, total, _ in rows]
+    used = [{'lot': name, 'hours': round(total, 2) if total else 0} for name, _, total in rows]
+    return spent, used
@@ -0,0 +1,85 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, Spot, Reserve
+from services.allocator import claim_spot, release_claim
+from services.availability import spot_freed, spot_taken
+from services.billing import cost_of
+from services.reporting import record_release
+from services.vehicles import normalize_plate
+
+
+class AlreadyReleased(Exception):
+    pass
+
+
+def open_reservation(lot_id, price_per_hour, user_id, vehicle_number):
+    # Claim a free spot in the lot and start a reservation on it, in the
+    # caller's transaction. Returns None when the lot is full; raises
+    # IntegrityError when the vehicle already has an open reservation.
+    spot_id = claim_spot(lot_id)
+    if spot_id is None:
+        return None
+
+    reservation = Reserve(
+        spot_id=spot_id,
+        user_id=user_id,
+        vehicle_number=normalize_plate(vehicle_number),
+        start_time=datetime.now(),
+        end_time=None,
+        cost_per_hour=price_per_hour,
+    )
+    # The claim's UPDATE has already opened the write transaction, so the
+    # savepoint nests inside it and a duplicate plate only undoes this insert.
+    try:
+        with db.session.begin_nested():
+            db.session.add(reservation)
+    except IntegrityError:
+        release_claim(spot_id)
+        raise
+    spot_taken(lot_id, spot_id)
+    return reservation
+
+
+def find_open_reservation(vehicle_number, user_id=None):
+    # Fast path for the duplicate check; ix_reserve_vehicle_open (unique, partial
+    # on end_time IS NULL) is what actually stops a second open reservation.
+    query = Reserve.query.filter(
+        Reserve.vehicle_number == normalize_plate(vehicle_number), Reserve.end_time.is_(None),
+    )
+    if user_id is not None:
+        query = query.filter(Reserve.user_id == user_id)
+    return query.first()
+
+
+def close_reservation(reservation, end_time):
+    # Close an open reservation, free its spot and book the revenue, all in the
+    # caller's transaction. Returns the lot id whose cached availability is now
+    # stale; raises AlreadyReleased when a concurrent release closed it first.
+    total_cost = cost_of(reservation, end_time)
+    closed = db.session.execute(
+        update(Reserve)
+        .where(Reserve.id == reservation.id, Reserve.end_time.is_(None))
+        .values(end_time=end_time, total_cost=total_cost)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if closed != 1:
+        raise AlreadyReleased(reservation.id)
+    set_committed_value(reservation, 'end_time', end_time)
+    set_committed_value(reservation, 'total_cost', total_cost)
+
+    lot_id = db.session.scalar(select(Spot.lot_id).where(Spot.id == reservation.spot_id))
+    if lot_id is None:
+        return None
+    freed = db.session.execute(
+        update(Spot)
+        .where(Spot.id == reservation.spot_id, Spot.status == True)
+        .values(status=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if freed:
+        spot_freed(lot_id, reservation.spot_id)
+    # Only the release whose UPDATE closed the row gets here, so revenue is booked once.
+    record_release(reservation, lot_id)
+    return lot_id
@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import os
+import time
+from functools import wraps
+from flask import current_app, g, make_response, request, session
+from jinja2 import FileSystemBytecodeCache
+from services.cache import data_version, get_page_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {'text/html', 'application/json'}
+
+
+def negotiate_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(response, encoding):
+    # Compress a buffered response in place if it is large enough to be worth it.
+    data = response.get_data()
+    if not encoding or len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return None
+    level = current_app.config['COMPRESS_LEVEL']
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=level))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    return encoding
+
+
+def compress_response(response):
+    if (not current_app.config['COMPRESS_MIN_SIZE'] or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or response.mimetype not in COMPRESSIBLE or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    compress(response, negotiate_encoding())
+    return response
+
+
+def cached_page(view):
+    # Serve a signed-in user's page from the cache, or answer 304, until a write
+    # bumps the data version or the RESPONSE_CACHE_SECONDS window rolls over.
+    # Goes under login_required/admin_required; pages with pending flashes bypass it.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        seconds = current_app.config['RESPONSE_CACHE_SECONDS']
+        if not seconds or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        principal = g.principal
+        stamp = f"{data_version()}:{int(time.time() // seconds)}:{principal.id}:{principal.is_admin}:{request.full_path}"
+        etag = hashlib.sha1(stamp.encode()).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            cache = get_page_cache()
+            encoding = negotiate_encoding()
+            key = f"page:{etag}:{encoding}"
+            cached = cache.get_many([key]).get(key)
+            if cached is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                cache.set_many({key: (compress(response, encoding), response.get_data())})
+            else:
+                applied, body = cached
+                response = current_app.response_class(body)
+                if applied:
+                    response.headers['Content-Encoding'] = applied
+
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.update(('Accept-Encoding', 'Cookie'))
+        return response
+    return wrapper
+
+
+def init_responses(app):
+    # Parse every template up front, so the first request to each page does not
+    # pay for it; with TEMPLATE_CACHE_DIR set the compiled bytecode is also kept
+    # on disk and reused by later processes (gunicorn workers, restarts).
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    app.after_request(compress_response)
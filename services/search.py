@@ -0,0 +1,80 @@
+import re
+from flask import current_app
+from sqlalchemy import Float, Integer, false, or_, text
+from sqlalchemy.exc import OperationalError
+from models import db, Lot
+
+SEARCH_TABLE = 'lot_search'
+
+
+def create_search_index(conn):
+    # FTS5 index over lot name/address/pincode keyed by lot id. Returns False when
+    # the backend has no FTS5, in which case search falls back to ILIKE.
+    if conn.dialect.name != 'sqlite':
+        return False
+    try:
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(name, address, pincode, tokenize='unicode61', prefix='2 3')"
+        )
+    except OperationalError:
+        return False
+    conn.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    conn.exec_driver_sql(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, name, address, pincode) "
+        "SELECT id, name, address, pincode FROM parkinglot"
+    )
+    return True
+
+
+def search_index_available():
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).first() is not None
+
+
+def use_search_index():
+    return current_app.extensions.get('lot_search', False)
+
+
+def index_lot(lot):
+    # Runs in the caller's transaction so the index never disagrees with parkinglot.
+    if not use_search_index():
+        return
+    db.session.flush()
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": lot.id})
+    db.session.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (rowid, name, address, pincode) VALUES (:id, :name, :address, :pincode)"),
+        {"id": lot.id, "name": lot.name, "address": lot.address, "pincode": lot.pincode},
+    )
+
+
+def match_expression(query):
+    # Every word must prefix-match some column: 'mg roa' -> '"mg"* "roa"*'
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_lots(query, *columns, fields=('name', 'address', 'pincode')):
+    # Returns a query over (Lot, *columns) filtered to lots matching `query`,
+    # best matches first. `fields` limits which lot columns are searched.
+    lots = db.session.query(Lot, *columns)
+
+    if not use_search_index():
+        return lots.filter(or_(*(getattr(Lot, field).ilike(f"%{query}%") for field in fields)))
+
+    expression = match_expression(query)
+    if not expression:
+        return lots.filter(false())
+    if tuple(fields) != ('name', 'address', 'pincode'):
+        expression = "{" + " ".join(fields) + "} : (" + expression + ")"
+
+    matches = (
+        text(f"SELECT rowid AS lot_id, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expression")
+        .bindparams(expression=expression)
+        .columns(lot_id=Integer, rank=Float)
+        .subquery()
+    )
+    return lots.join(matches, matches.c.lot_id == Lot.id).order_by(matches.c.rank)
@@ -0,0 +1,22 @@
+import re
+from collections import namedtuple
+from sqlalchemy import select
+from models import db, Spot, Reserve
+
+ParkedVehicle = namedtuple('ParkedVehicle', ['plate', 'reservation_id', 'spot_id', 'lot_id', 'user_id', 'start_time'])
+
+
+def normalize_plate(value):
+    # 'ka-01 ab 1234' -> 'KA01AB1234'
+    return re.sub(r'[^0-9A-Za-z]', '', value or '').upper()
+
+
+def locate_vehicle(plate):
+    # One seek on ix_reserve_vehicle_open (unique, partial on end_time IS NULL),
+    # so every worker answers from the committed state.
+    row = db.session.execute(
+        select(Reserve.vehicle_number, Reserve.id, Reserve.spot_id, Spot.lot_id, Reserve.user_id, Reserve.start_time)
+        .join(Spot, Spot.id == Reserve.spot_id)
+        .where(Reserve.vehicle_number == plate, Reserve.end_time.is_(None))
+    ).first()
+    return ParkedVehicle(*row) if row else None
@@ -0,0 +1,8 @@
+import os
+from app import create_app
+
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+if not os.environ.get('SECRET_KEY') and not os.environ.get('SECRET_KEY_FILE'):
+    raise RuntimeError("Set SECRET_KEY (or SECRET_KEY_FILE) before serving; every worker must sign sessions with the same key.")
+
+app = create_app()